@@ -158,19 +158,21 @@
 #             )
 
 import os
+from uuid import uuid4
 
 import streamlit as st
-from dotenv import load_dotenv
 
-from core.logic import chat_response
-from core.ui import render_chat_history
-from src.ai.gemini_api import InfoExtractionChatBot
-from src.yelp.yelp_api import YelpAPI
+from core import resources
+from core.history import ChatHistory
+from core.logic import chat_response_stream
+from core.refine import Conversation
+from core.ui import render_chat_history, render_ops_panel, render_response_stream
 
-# Load environment variables
-load_dotenv()
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-YELP_API_KEY = os.getenv("YELP_API_KEY")
+# Environment variables are loaded by core.resources; clients are built there once per process.
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "50"))
+HISTORY_SPILL_DIR = os.getenv("HISTORY_SPILL_DIR")
+CANDIDATE_BUDGET = int(os.getenv("CANDIDATE_BUDGET", "0")) or None
+OPS_PANEL = os.getenv("OPS_PANEL") == "1"
 
 # Streamlit Page Config
 st.set_page_config(page_title="Restaurant Recommendation ChatBot", page_icon="🍽️", layout="wide")
@@ -178,18 +180,22 @@ st.set_page_config(page_title="Restaurant Recommendation ChatBot", page_icon="
 # Header and Expander
 st.title("🍽️ Restaurant Recommendation ChatBot")
 st.caption("Find the best places to eat based on your preferences")
-with st.expander("🔑 Debug API Keys"):
-    st.write(f"Google Gemini Key: `{GOOGLE_API_KEY}`")
-    st.write(f"Yelp API Key: `{YELP_API_KEY}`")
+# Filled in at the end of the run so the panel includes this turn's timings.
+ops_panel = st.container()
 st.markdown("---")
 
 # Initialize Session State
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-
-# Instantiate APIs
-gemini = InfoExtractionChatBot(api_key=GOOGLE_API_KEY)
-yelp = YelpAPI(api_key=YELP_API_KEY)
+if "history" not in st.session_state:
+    spill_path = None
+    if HISTORY_SPILL_DIR:
+        spill_path = os.path.join(HISTORY_SPILL_DIR, f"{uuid4().hex}.jsonl")
+    st.session_state.history = ChatHistory(max_messages=HISTORY_MAX_MESSAGES, spill_path=spill_path)
+if "conversation" not in st.session_state:
+    st.session_state.conversation = Conversation()
+
+# Shared metrics (clients are fetched from core.resources when a query arrives)
+metrics = resources.setup_metrics()
+resources.start_metrics_server()
 
 # User Input and Response
 st.markdown("### 💬 Ask me anything about restaurants!")
@@ -197,10 +203,26 @@ user_input = st.text_input(
     "Type your query (e.g., *Find me a sushi place in New York*)", key="input"
 )
 
-if user_input:
-    st.session_state.messages.append({"role": "user", "content": user_input})
-    bot_reply = chat_response(user_input, gemini, yelp)
-    st.session_state.messages.append({"role": "bot", "content": bot_reply})
+# Widget interactions (e.g. paging the history) rerun the script; only answer new input.
+if user_input and user_input != st.session_state.get("last_input"):
+    st.session_state.last_input = user_input
+    st.session_state.history.append({"role": "user", "content": user_input})
+    # The Gemini bot is only built (and LangChain imported) once the first query arrives.
+    events = chat_response_stream(
+        user_input,
+        resources.get_chatbot(),
+        resources.get_yelp_client(),
+        local_index=resources.get_local_index(),
+        candidate_budget=CANDIDATE_BUDGET,
+        conversation=st.session_state.conversation,
+        search_pool=resources.get_search_pool(),
+    )
+    bot_reply = render_response_stream(events)
+    st.session_state.history.append({"role": "bot", "content": bot_reply})
 
 # Render Chat History
 render_chat_history()
+
+if OPS_PANEL:
+    with ops_panel, st.expander("📊 Ops"):
+        render_ops_panel(metrics.snapshot())
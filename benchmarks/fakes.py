@@ -0,0 +1,217 @@
+"""
+# Benchmark Stand-ins
+# This module provides offline replacements for the two upstreams: a local HTTP server that
+# answers Yelp business searches with canned payloads, and a chat model that plugs into
+# InfoExtractionChatBot in place of ChatGoogleGenerativeAI. Both simulate latency and
+# failures and count the calls they receive.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import orjson
+from google.api_core.exceptions import ResourceExhausted
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+from src.ai.local_extractor import LocalInfoExtractor
+
+CATEGORIES = ["Sushi Bars", "Italian", "Mexican", "Thai", "Indian", "Pizza", "Ramen", "Vegan"]
+
+
+def fake_business(i, location, padding=0):
+    """Return a Yelp-shaped business dictionary; ``padding`` adds filler bytes."""
+    category = CATEGORIES[i % len(CATEGORIES)]
+    business = {
+        "id": f"biz-{i}",
+        "alias": f"biz-{i}",
+        "name": f"Restaurant {i}",
+        "rating": 3.0 + (i * 7 % 5) * 0.5,
+        "review_count": (i * 37) % 2000,
+        "price": "$" * (1 + i % 4),
+        "url": f"https://www.yelp.com/biz/biz-{i}",
+        "is_closed": False,
+        "phone": "+14155550100",
+        "display_phone": "(415) 555-0100",
+        "distance": float((i * 131) % 5000),
+        "categories": [{"alias": category.lower().replace(" ", "_"), "title": category}],
+        "transactions": ["delivery", "pickup"][: i % 3],
+        "coordinates": {
+            "latitude": 37.7 + (i % 100) / 1000,
+            "longitude": -122.4 - (i % 100) / 1000,
+        },
+        "location": {"city": location, "display_address": [f"{i} Main St", location]},
+        "business_hours": [{"is_open_now": bool(i % 2)}],
+    }
+    if padding:
+        business["description"] = "x" * padding
+    return business
+
+
+class FakeYelpServer:
+    """
+    A local stand-in for the Yelp business search endpoint.
+
+    Each request sleeps ``latency`` seconds (plus up to ``jitter``), then fails with a 503
+    (or a 429 with Retry-After: 0) at ``error_rate``, or returns ``limit`` businesses starting
+    at ``offset`` out of ``total``.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, padding=0, total=240, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.padding = padding
+        self.total = total
+        self.calls = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v3/businesses/search"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, headers, body = fake.respond(parse_qs(urlparse(self.path).query))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def respond(self, query):
+        """Build the (status, headers, body) answer for one parsed query string."""
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+            throttle = self._random.random() < 0.5
+        time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.errors += 1
+            if throttle:
+                return 429, {"Retry-After": "0"}, b'{"error": {"code": "TOO_MANY_REQUESTS"}}'
+            return 503, {}, b'{"error": {"code": "SERVICE_UNAVAILABLE"}}'
+
+        location = query.get("location", ["San Francisco"])[0]
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["5"])[0])
+        businesses = [
+            fake_business(i, location, self.padding)
+            for i in range(offset, min(offset + limit, self.total))
+        ]
+        body = orjson.dumps({"businesses": businesses, "total": self.total})
+        with self._lock:
+            self.bytes_sent += len(body)
+        return 200, {}, body
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    A chat model that answers extraction prompts without a network call.
+
+    The slots are read from the last "User:" line with the rule-based extractor and returned
+    as a fenced JSON block, like Gemini does. Each call sleeps ``latency`` seconds and raises
+    ResourceExhausted (HTTP 429) at ``error_rate``.
+    """
+
+    latency: float = 0.3
+    error_rate: float = 0.0
+    seed: int = 0
+    _calls: int = PrivateAttr(default=0)
+    _errors: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _random: random.Random = PrivateAttr(default=None)
+    _extractor: LocalInfoExtractor = PrivateAttr(default_factory=LocalInfoExtractor)
+
+    def model_post_init(self, context):
+        self._random = random.Random(self.seed)
+
+    @property
+    def _llm_type(self):
+        return "fake-extraction"
+
+    @property
+    def calls(self):
+        return self._calls
+
+    @property
+    def errors(self):
+        return self._errors
+
+    def _answer(self, messages):
+        with self._lock:
+            self._calls += 1
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self._errors += 1
+        if fail:
+            raise ResourceExhausted("Simulated quota exhaustion")
+
+        prompt = messages[-1].content
+        user_prompt = prompt.rsplit("User:", 1)[-1].rsplit("Extracted:", 1)[0].strip()
+        info, _ = self._extractor.extract(user_prompt)
+        info = {
+            "cuisine": info.get("cuisine") or "restaurant",
+            "location": info.get("location") or "San Francisco",
+            "price": info.get("price") or "moderate",
+            "limit": info.get("limit") or 5,
+        }
+        text = "```json\n" + orjson.dumps(info).decode() + "\n```"
+        message = AIMessage(
+            content=text,
+            usage_metadata={
+                "input_tokens": len(prompt) // 4,
+                "output_tokens": len(text) // 4,
+                "total_tokens": (len(prompt) + len(text)) // 4,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return self._answer(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._answer(messages)
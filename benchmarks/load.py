@@ -0,0 +1,163 @@
+"""
+# Load Driver
+# Drives core.logic.chat_response end to end against the local stand-ins in benchmarks.fakes
+# and reports throughput, latency percentiles, the memory high-water mark and upstream call
+# counts as JSON, so runs can be compared without API keys.
+#
+# Usage:
+#     python -m benchmarks.load --requests 200 --concurrency 16 --output results.json
+"""
+
+import argparse
+import itertools
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import orjson
+
+from benchmarks.fakes import FakeChatModel, FakeYelpServer
+from core.logic import chat_response
+from src.ai.cache import ExtractionCache
+from src.ai.gemini_api import InfoExtractionChatBot
+from src.ai.local_extractor import LocalInfoExtractor
+from src.net.throttle import Upstream
+from src.telemetry.metrics import METRICS
+from src.yelp.cache import CachedYelpAPI, MemoryCacheBackend
+from src.yelp.yelp_api import YelpAPI
+
+PROMPTS = [
+    "Find me a cheap sushi place in San Francisco",
+    "I want Italian food in New York, not too expensive (3 restaurants)",
+    "Recommend a fancy French restaurant in Paris for a special occasion",
+    "thai or ramen in Seattle",
+    "Somewhere nice for a birthday dinner with my parents near Brooklyn, maybe seafood?",
+    "cheap tacos in Austin, 4 restaurants",
+    "We are a group of six looking for vegan options around Boston tonight",
+    "pizza in Chicago",
+]
+
+
+def build_pipeline(args, yelp_server, llm):
+    """Build the Gemini and Yelp clients the app would use, pointed at the stand-ins."""
+    yelp = YelpAPI(
+        api_key="benchmark",
+        base_url=yelp_server.base_url,
+        pool_size=args.concurrency,
+        upstream=Upstream("yelp", rate=args.yelp_rate, retries=args.retries, base_delay=0.05),
+    )
+    if args.cache:
+        yelp = CachedYelpAPI(yelp, backend=MemoryCacheBackend())
+    gemini = InfoExtractionChatBot(
+        api_key="benchmark",
+        cache=ExtractionCache() if args.cache else None,
+        local_extractor=LocalInfoExtractor() if args.local_extractor else None,
+        upstream=Upstream("gemini", rate=args.llm_rate, retries=args.retries, base_delay=0.05),
+        llm=llm,
+        max_examples=args.examples,
+    )
+    return gemini, yelp
+
+
+def percentiles(latencies_ms):
+    if not latencies_ms:
+        return {}
+    values = np.asarray(latencies_ms)
+    return {
+        "mean": float(values.mean()),
+        **{f"p{p}": float(np.percentile(values, p)) for p in (50, 90, 95, 99)},
+        "max": float(values.max()),
+    }
+
+
+def run_benchmark(args):
+    """Run one load test described by ``args`` and return the results dictionary."""
+    METRICS.reset()
+    llm = FakeChatModel(latency=args.llm_latency, error_rate=args.llm_error_rate, seed=args.seed)
+    with FakeYelpServer(
+        latency=args.yelp_latency,
+        jitter=args.yelp_jitter,
+        error_rate=args.yelp_error_rate,
+        padding=args.payload_padding,
+        seed=args.seed,
+    ) as yelp_server:
+        gemini, yelp = build_pipeline(args, yelp_server, llm)
+        prompts = list(itertools.islice(itertools.cycle(PROMPTS), args.requests))
+
+        def _one(prompt):
+            start = time.perf_counter()
+            try:
+                response = chat_response(
+                    prompt, gemini, yelp, candidate_budget=args.candidate_budget
+                )
+                ok = response is not None and response.get("type") == "cards"
+            except Exception:
+                ok = False
+            return (time.perf_counter() - start) * 1000.0, ok
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = list(pool.map(_one, prompts))
+        elapsed = time.perf_counter() - started
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        yelp.close()
+
+    latencies = [ms for ms, _ in outcomes]
+    return {
+        "config": vars(args),
+        "requests": len(outcomes),
+        "succeeded": sum(ok for _, ok in outcomes),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(outcomes) / elapsed if elapsed else 0.0,
+        "latency_ms": percentiles(latencies),
+        "memory_peak_bytes": peak_bytes,
+        "upstream_calls": {
+            "yelp": yelp_server.calls,
+            "yelp_errors": yelp_server.errors,
+            "yelp_bytes": yelp_server.bytes_sent,
+            "llm": llm.calls,
+            "llm_errors": llm.errors,
+        },
+        "stages": METRICS.snapshot()["histograms"],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for the chat pipeline.")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--yelp-latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--yelp-jitter", type=float, default=0.02)
+    parser.add_argument("--yelp-error-rate", type=float, default=0.0)
+    parser.add_argument("--payload-padding", type=int, default=0, help="bytes per business")
+    parser.add_argument("--yelp-rate", type=float, default=None, help="client requests/second")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per call")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-rate", type=float, default=None, help="client calls/second")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--examples", type=int, default=2, help="few-shot examples per prompt")
+    parser.add_argument("--candidate-budget", type=int, default=None)
+    parser.add_argument("--cache", action="store_true", help="enable Yelp and prompt caches")
+    parser.add_argument(
+        "--local-extractor", action="store_true", help="answer simple prompts without the LLM"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    results = run_benchmark(parse_args(argv))
+    payload = orjson.dumps(results, option=orjson.OPT_INDENT_2)
+    if results["config"]["output"]:
+        with open(results["config"]["output"], "wb") as f:
+            f.write(payload)
+    sys.stdout.write(payload.decode() + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+# Startup Benchmark
+# Measures cold start and per-rerun overhead of the Streamlit app:
+#   - import time of the app's modules in a fresh interpreter,
+#   - first-build time of every shared resource in core.resources,
+#   - the cost of a rerun that reuses the shared chatbot versus one that rebuilds it,
+#   - the first run and a rerun of app.py under Streamlit's AppTest harness.
+#
+# Usage:
+#     python -m benchmarks.startup --output startup.json
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import orjson
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_PROBE = """
+import time
+start = time.perf_counter()
+import {module}
+print((time.perf_counter() - start) * 1000.0)
+"""
+
+APP_MODULES = ["core.resources", "core.logic", "core.ui", "core.history", "src.ai.gemini_api"]
+
+
+def import_ms(module, repeat=3):
+    """Median import time of ``module`` in fresh interpreters, in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE.format(module=module)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000.0
+
+
+def resource_build_ms():
+    """First-build and cached-lookup time for each shared resource, in milliseconds."""
+    from core import resources
+
+    getters = [
+        "get_local_extractor",
+        "get_extraction_cache",
+        "get_yelp_client",
+        "get_local_index",
+        "get_chatbot",
+    ]
+    return {
+        name: {
+            "first_ms": _timed(getattr(resources, name)),
+            "cached_ms": _timed(getattr(resources, name)),
+        }
+        for name in getters
+    }
+
+
+def rerun_ms(reruns=20):
+    """Per-rerun cost of obtaining the chatbot: shared instance vs. rebuilding each time."""
+    from core import resources
+    from src.ai.gemini_api import InfoExtractionChatBot
+
+    def rebuild():
+        InfoExtractionChatBot(
+            cache=resources.get_extraction_cache(),
+            local_extractor=resources.get_local_extractor(),
+        )
+
+    return {
+        "shared_ms": statistics.median(_timed(resources.get_chatbot) for _ in range(reruns)),
+        "rebuilt_ms": statistics.median(_timed(rebuild) for _ in range(reruns)),
+    }
+
+
+def app_ms():
+    """First run and rerun of app.py under Streamlit's testing harness, in milliseconds."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    first = _timed(app.run)
+    rerun = _timed(app.run)
+    return {"first_run_ms": first, "rerun_ms": rerun, "exception": bool(app.exception)}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for the chatbot app.")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per import")
+    parser.add_argument("--skip-app", action="store_true", help="skip the AppTest runs")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Placeholder keys let the clients be constructed; nothing here calls the APIs.
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.setdefault("YELP_API_KEY", "benchmark")
+    results = {
+        "imports_ms": {module: import_ms(module, args.repeat) for module in APP_MODULES},
+        "resources": resource_build_ms(),
+        "chatbot_per_rerun": rerun_ms(),
+    }
+    if not args.skip_app:
+        results["app"] = app_ms()
+    payload = orjson.dumps(results, option=orjson.OPT_INDENT_2)
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(payload)
+    sys.stdout.write(payload.decode() + "\n")
+
+
+if __name__ == "__main__":
+    main()
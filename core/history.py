@@ -0,0 +1,111 @@
+import os
+from collections import deque
+
+import orjson
+
+from src.yelp.records import RestaurantRecord, restaurant_key
+
+
+class ChatMessage:
+    """A chat message that refers to restaurants by id instead of embedding them."""
+
+    __slots__ = ("seq", "role", "kind", "text", "restaurant_ids")
+
+    def __init__(self, seq, role, kind, text=None, restaurant_ids=()):
+        self.seq = seq
+        self.role = role
+        self.kind = kind
+        self.text = text
+        self.restaurant_ids = restaurant_ids
+
+
+class ChatHistory:
+    """
+    A bounded, compact chat history for one Streamlit session.
+
+    Restaurants live once in a shared table of RestaurantRecord objects; messages only hold
+    their ids. Once more than ``max_messages`` are stored, the oldest are evicted (and, if
+    ``spill_path`` is set, appended to a JSONL file first), and restaurants no longer
+    referenced by any message are dropped from the table.
+    """
+
+    def __init__(self, max_messages=50, spill_path=None):
+        """
+        Initialize the history.
+
+        Args:
+            max_messages (int): Maximum number of messages kept in memory.
+            spill_path (str): Optional JSONL file that receives evicted messages.
+        """
+        self.max_messages = max_messages
+        self.spill_path = spill_path
+        self.restaurants = {}
+        self.archived = 0
+        self._messages = deque()
+        self._refcounts = {}
+        self._next_seq = 0
+
+    def append(self, message):
+        """
+        Add a message in the app's dict form, e.g. {"role": "user", "content": "..."} or
+        {"role": "bot", "content": {"type": "cards", "data": [...]}}.
+        """
+        role, content = message["role"], message["content"]
+        if role == "user":
+            entry = ChatMessage(self._next_seq, role, "text", text=content)
+        elif content.get("type") == "cards":
+            ids = tuple(self._intern_restaurant(r) for r in content["data"])
+            entry = ChatMessage(self._next_seq, role, "cards", restaurant_ids=ids)
+        else:
+            entry = ChatMessage(self._next_seq, role, "text", text=content["content"])
+        self._next_seq += 1
+        self._messages.append(entry)
+
+        evicted = []
+        while len(self._messages) > self.max_messages:
+            evicted.append(self._messages.popleft())
+        if evicted:
+            self._spill(evicted)
+            for old in evicted:
+                self._release(old)
+            self.archived += len(evicted)
+
+    def _intern_restaurant(self, restaurant):
+        key = restaurant_key(restaurant)
+        if key not in self.restaurants:
+            if not isinstance(restaurant, RestaurantRecord):
+                restaurant = RestaurantRecord.from_dict(restaurant)
+            self.restaurants[key] = restaurant
+        self._refcounts[key] = self._refcounts.get(key, 0) + 1
+        return key
+
+    def _release(self, message):
+        for key in message.restaurant_ids:
+            self._refcounts[key] -= 1
+            if not self._refcounts[key]:
+                del self._refcounts[key]
+                del self.restaurants[key]
+
+    def _spill(self, messages):
+        if not self.spill_path:
+            return
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        with open(self.spill_path, "ab") as f:
+            for message in messages:
+                record = {"seq": message.seq, **self.resolve(message)}
+                f.write(orjson.dumps(record, default=RestaurantRecord.to_dict) + b"\n")
+
+    def resolve(self, message: ChatMessage):
+        """Return a stored message in the app's dict form, with restaurant records filled in."""
+        if message.role == "user":
+            return {"role": "user", "content": message.text}
+        if message.kind == "cards":
+            data = [self.restaurants[key] for key in message.restaurant_ids]
+            return {"role": "bot", "content": {"type": "cards", "data": data}}
+        return {"role": "bot", "content": {"type": "text", "content": message.text}}
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __len__(self):
+        return len(self._messages)
@@ -1,8 +1,91 @@
-from src.ai.gemini_api import InfoExtractionChatBot
+import itertools
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from typing import TYPE_CHECKING
+
+from core.ranking import rank_restaurants
+from core.refine import Conversation, parse_followup, refine_from_candidates
+from src.telemetry.metrics import METRICS
+from src.yelp.records import restaurant_key
 from src.yelp.yelp_api import YelpAPI
 
+if TYPE_CHECKING:
+    # Only needed for annotations; importing them pulls in LangChain and the index at startup.
+    from src.ai.gemini_api import InfoExtractionChatBot
+    from src.yelp.local_index import LocalRestaurantIndex
+
+# Default pool for fanning out Yelp searches; YelpAPI's pooled session is thread-safe for GETs.
+# Servers pass a pool sized to their concurrency instead (see core.resources.get_search_pool).
+SEARCH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="yelp-search")
+MAX_INTENTS = 6
+
+# Only " or " separates alternatives; commas and slashes occur inside locations ("Washington, DC").
+_INTENT_SEPARATOR = re.compile(r"\s+or\s+", re.IGNORECASE)
+
+
+def _format(businesses, source):
+    """Formats raw businesses for the chatbot, timing the step and counting the source."""
+    METRICS.incr(f"search.{source}")
+    with METRICS.span("yelp.format"):
+        return YelpAPI.format_businesses_for_chatbot(businesses)
+
 
-def search_restaurants(yelp: YelpAPI, cuisine, location, price=None, limit=5):
+def iter_search_restaurants(
+    yelp: YelpAPI,
+    cuisine,
+    location,
+    price=None,
+    limit=5,
+    local_index: "LocalRestaurantIndex" = None,
+    candidate_budget=None,
+):
+    """
+    Searches for restaurants, yielding formatted batches as they become available.
+
+    Args:
+        yelp (YelpAPI): An instance of the YelpAPI class.
+        cuisine (str): The cuisine to search for.
+        location (str): The location for the search.
+        price (str): The price tier.
+        limit (int): Number of results for a plain search.
+        local_index (LocalRestaurantIndex): Optional local store queried before Yelp; the
+            live API is only called when it has fewer results than wanted, and its results
+            then follow the local ones.
+        candidate_budget (int): When larger than ``limit``, page through up to this many Yelp
+            results so ranking sees a deeper candidate pool; each page is yielded on arrival.
+
+    Yields:
+        Lists of formatted restaurant dictionaries.
+    """
+    term = cuisine if cuisine else "restaurant"
+    deep = bool(candidate_budget) and candidate_budget > limit
+    wanted = candidate_budget if deep else limit
+    if local_index is not None:
+        businesses = local_index.search(term=term, location=location, price=price, limit=wanted)
+        if businesses:
+            yield _format(businesses, "local")
+        if len(businesses) >= wanted:
+            return
+        # A short local result is topped up from Yelp; callers drop the duplicates.
+    if deep and hasattr(yelp, "iter_search_pages"):
+        for page in yelp.iter_search_pages(term, location, price, budget=candidate_budget):
+            yield _format(page, "yelp_page")
+        return
+    with METRICS.span("yelp.search"):
+        businesses = yelp.search(term=term, location=location, price=price, limit=limit)
+    yield _format(businesses, "yelp")
+
+
+def search_restaurants(
+    yelp: YelpAPI,
+    cuisine,
+    location,
+    price=None,
+    limit=5,
+    local_index: "LocalRestaurantIndex" = None,
+    candidate_budget=None,
+):
     """
     Searches for restaurants using the Yelp API with a given query.
 
@@ -11,46 +94,332 @@ def search_restaurants(yelp: YelpAPI, cuisine, location, price=None, limit=5):
         cuisine (str): The cuisine to search for.
         location (str): The location for the search.
         price (str): The price tier.
+        local_index (LocalRestaurantIndex): Optional local store queried before Yelp; the
+            live API is only called when it has fewer results than wanted.
+        candidate_budget (int): Optional number of candidates to page through on Yelp.
 
     Returns:
         A list of formatted restaurant dictionaries.
     """
-    term = cuisine if cuisine else "restaurant"
-    businesses = yelp.search(term=term, location=location, price=price, limit=limit)
-    return YelpAPI.format_businesses_for_chatbot(businesses)
+    batches = iter_search_restaurants(
+        yelp, cuisine, location, price, limit, local_index, candidate_budget
+    )
+    return merge_restaurants([list(itertools.chain.from_iterable(batches))])
+
 
+def _as_limit(value, default=5):
+    """Coerces an extracted limit (int, "3", "###", None) to a positive int."""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return limit if limit > 0 else default
 
-def chat_response(user_input, gemini: InfoExtractionChatBot, yelp: YelpAPI):
+
+def split_intents(info):
     """
-    Handles the core logic of processing a user's chat message and returning a response.
+    Expands an extraction result into one search intent per cuisine/location combination.
 
     Args:
-        user_input (str): The user's message.
-        gemini (InfoExtractionChatBot): An instance of the InfoExtractionChatBot class.
-        yelp (YelpAPI): An instance of the YelpAPI class.
+        info (dict): Extracted slots, where cuisine and location may hold several values
+            joined by " or ".
 
     Returns:
-        A dictionary containing the bot's response.
+        A list of at most MAX_INTENTS dictionaries with single-valued cuisine and location.
     """
-    gemini_reply = gemini.get_info_from_prompt(user_input)
-    if not gemini_reply:
+
+    def _values(value):
+        parts = [p for p in _INTENT_SEPARATOR.split(value or "") if p]
+        return parts or [value]
+
+    intents = []
+    for cuisine, location in itertools.product(
+        _values(info.get("cuisine")), _values(info.get("location"))
+    ):
+        intents.append(
+            {
+                **info,
+                "cuisine": cuisine,
+                "location": location,
+                "limit": _as_limit(info.get("limit")),
+            }
+        )
+    return intents[:MAX_INTENTS]
+
+
+def merge_restaurants(result_lists, seen=None):
+    """
+    Merges several result lists, dropping duplicate businesses by Yelp id.
+
+    Results are interleaved round-robin so every intent is represented near the top.
+    Pass ``seen`` to also drop businesses returned by an earlier call.
+    """
+    merged = []
+    seen = set() if seen is None else seen
+    for restaurant in itertools.chain.from_iterable(itertools.zip_longest(*result_lists)):
+        if restaurant is None:
+            continue
+        key = restaurant_key(restaurant)
+        if key not in seen:
+            seen.add(key)
+            merged.append(restaurant)
+    return merged
+
+
+def iter_search_intents(
+    yelp: YelpAPI,
+    intents,
+    deadline=10.0,
+    local_index=None,
+    candidate_budget=None,
+    search_pool=None,
+):
+    """
+    Runs one Yelp search per intent concurrently, yielding results as each search finishes.
+
+    Args:
+        yelp (YelpAPI): An instance of the YelpAPI class.
+        intents (list): Intent dictionaries as returned by split_intents.
+        deadline (float): Seconds to wait for all searches; late searches are dropped.
+        local_index (LocalRestaurantIndex): Optional local store queried before Yelp.
+        candidate_budget (int): Optional number of candidates to page through per intent.
+        search_pool (ThreadPoolExecutor): Pool running the searches; defaults to SEARCH_POOL.
+
+    Yields:
+        Lists of formatted restaurant dictionaries not seen in earlier batches.
+    """
+
+    def _search_args(intent):
         return {
-            "type": "text",
-            "content": "❌ Sorry, I couldn't extract the necessary information from your request.",
+            "yelp": yelp,
+            "cuisine": intent.get("cuisine"),
+            "location": intent.get("location"),
+            "price": intent.get("price"),
+            "limit": intent.get("limit", 5),
+            "local_index": local_index,
+            "candidate_budget": candidate_budget,
         }
 
-    restaurants = search_restaurants(
-        yelp=yelp,
-        cuisine=gemini_reply.get("cuisine"),
-        location=gemini_reply.get("location"),
-        price=gemini_reply.get("price"),
-        limit=gemini_reply.get("limit", 5),
+    seen = set()
+    if len(intents) == 1:
+        # A single search streams its result pages straight through.
+        for batch in iter_search_restaurants(**_search_args(intents[0])):
+            batch = merge_restaurants([batch], seen)
+            if batch:
+                yield batch
+        return
+
+    pool = search_pool or SEARCH_POOL
+    futures = [pool.submit(search_restaurants, **_search_args(i)) for i in intents]
+    errors, found = [], False
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            if future.exception() is not None:
+                errors.append(future.exception())
+                continue
+            found = True
+            batch = merge_restaurants([future.result()], seen)
+            if batch:
+                yield batch
+    except TimeoutError:
+        for future in futures:
+            future.cancel()
+
+    if not found and errors:
+        raise errors[0]
+
+
+def search_intents(
+    yelp: YelpAPI,
+    intents,
+    deadline=10.0,
+    local_index=None,
+    candidate_budget=None,
+    search_pool=None,
+):
+    """
+    Runs one Yelp search per intent concurrently and merges the results.
+
+    Returns:
+        A deduplicated list of formatted restaurant dictionaries.
+    """
+    batches = iter_search_intents(
+        yelp,
+        intents,
+        deadline=deadline,
+        local_index=local_index,
+        candidate_budget=candidate_budget,
+        search_pool=search_pool,
     )
+    return merge_restaurants(list(batches))
 
-    if not restaurants:
-        return {"type": "text", "content": "😞 Sorry, I couldn't find any matching restaurants."}
 
-    # Sort the restaurants by rating from lowest to highest.
-    restaurants = sorted(restaurants, key=lambda x: x["rating"])
+def chat_response_stream(
+    user_input,
+    gemini: "InfoExtractionChatBot",
+    yelp: YelpAPI,
+    deadline=10.0,
+    local_index=None,
+    candidate_budget=None,
+    conversation: Conversation = None,
+    search_pool=None,
+):
+    """
+    Processes a user's chat message, yielding progress events as each stage completes.
+
+    Events are dictionaries with an "event" key:
+        - "extraction": ``data`` holds the extracted slots, ``limit`` the number of
+          restaurants the final response will hold and ``refined`` whether the slots were
+          patched from the previous turn instead of extracted.
+        - "partial": ``data`` holds restaurants that just arrived from one search.
+        - "final": ``content`` holds the bot's response, as returned by chat_response.
+
+    Args:
+        user_input (str): The user's message.
+        gemini (InfoExtractionChatBot): An instance of the InfoExtractionChatBot class.
+        yelp (YelpAPI): An instance of the YelpAPI class.
+        deadline (float): Seconds allowed for the Yelp searches of a multi-intent request.
+        local_index (LocalRestaurantIndex): Optional local store queried before Yelp.
+        candidate_budget (int): Optional number of candidates to retrieve and re-rank per
+            intent before keeping the requested limit.
+        conversation (Conversation): Optional session state. Follow-ups ("cheaper ones",
+            "3 more") patch the previous turn's slots without calling Gemini, and are answered
+            from the previous turn's candidates when possible.
+        search_pool (ThreadPoolExecutor): Optional pool for multi-intent searches.
+    """
+    started = time.perf_counter()
+
+    def _final(content):
+        METRICS.observe("chat.total", (time.perf_counter() - started) * 1000.0)
+        return {"event": "final", "content": content}
+
+    refinement = None
+    if conversation is not None:
+        refinement = parse_followup(
+            user_input, conversation, getattr(gemini, "local_extractor", None)
+        )
+    if refinement is not None:
+        METRICS.incr("chat.refinements")
+        gemini_reply = refinement["slots"]
+    else:
+        with METRICS.span("chat.extract"):
+            gemini_reply = gemini.get_info_from_prompt(user_input)
+    if not gemini_reply:
+        yield _final(
+            {
+                "type": "text",
+                "content": "❌ Sorry, I couldn't extract the necessary information from your request.",
+            }
+        )
+        return
+    intents = split_intents(gemini_reply)
+    more = refinement["more"] if refinement is not None else None
+    limit = more or sum(intent["limit"] for intent in intents)
+    yield {
+        "event": "extraction",
+        "data": gemini_reply,
+        "limit": limit,
+        "refined": refinement is not None,
+    }
 
-    return {"type": "cards", "data": restaurants}
+    if refinement is not None:
+        refined = refine_from_candidates(conversation, refinement)
+        if refined:
+            METRICS.incr("chat.refined_from_candidates")
+            conversation.remember(
+                gemini_reply, conversation.candidates, refined, keep_shown=bool(more)
+            )
+            yield _final({"type": "cards", "data": refined})
+            return
+
+    exclude = set()
+    if more:
+        # Fetch past the restaurants already shown, then drop them.
+        exclude = conversation.shown
+        for intent in intents:
+            intent["limit"] = min(intent["limit"] + len(exclude), YelpAPI.MAX_PAGE_SIZE)
+
+    batches = []
+    batches_in_flight = iter_search_intents(
+        yelp,
+        intents,
+        deadline=deadline,
+        local_index=local_index,
+        candidate_budget=candidate_budget,
+        search_pool=search_pool,
+    )
+    # Search time excludes the time consumers spend handling partial events.
+    search_ms, waited_from = 0.0, time.perf_counter()
+    for batch in batches_in_flight:
+        search_ms += (time.perf_counter() - waited_from) * 1000.0
+        if exclude:
+            batch = [r for r in batch if restaurant_key(r) not in exclude]
+        batches.append(batch)
+        yield {"event": "partial", "data": batch}
+        waited_from = time.perf_counter()
+    search_ms += (time.perf_counter() - waited_from) * 1000.0
+    METRICS.observe("chat.search", search_ms)
+    candidates = merge_restaurants(batches)
+
+    if not candidates:
+        yield _final(
+            {"type": "text", "content": "😞 Sorry, I couldn't find any matching restaurants."}
+        )
+        return
+
+    # Rank the restaurants best first.
+    with METRICS.span("chat.rank", candidates=len(candidates)):
+        restaurants = rank_restaurants(
+            candidates,
+            cuisine=gemini_reply.get("cuisine"),
+            price=gemini_reply.get("price"),
+            k=limit,
+        )
+
+    if conversation is not None:
+        if more:
+            candidates = merge_restaurants([conversation.candidates, candidates])
+        conversation.remember(gemini_reply, candidates, restaurants, keep_shown=bool(more))
+    yield _final({"type": "cards", "data": restaurants})
+
+
+def chat_response(
+    user_input,
+    gemini: "InfoExtractionChatBot",
+    yelp: YelpAPI,
+    deadline=10.0,
+    local_index=None,
+    candidate_budget=None,
+    conversation: Conversation = None,
+    search_pool=None,
+):
+    """
+    Handles the core logic of processing a user's chat message and returning a response.
+
+    Args:
+        user_input (str): The user's message.
+        gemini (InfoExtractionChatBot): An instance of the InfoExtractionChatBot class.
+        yelp (YelpAPI): An instance of the YelpAPI class.
+        deadline (float): Seconds allowed for the Yelp searches of a multi-intent request.
+        local_index (LocalRestaurantIndex): Optional local store queried before Yelp.
+        candidate_budget (int): Optional number of candidates to retrieve and re-rank per
+            intent before keeping the requested limit.
+        conversation (Conversation): Optional session state used to resolve follow-ups.
+        search_pool (ThreadPoolExecutor): Optional pool for multi-intent searches.
+
+    Returns:
+        A dictionary containing the bot's response.
+    """
+    events = chat_response_stream(
+        user_input,
+        gemini,
+        yelp,
+        deadline=deadline,
+        local_index=local_index,
+        candidate_budget=candidate_budget,
+        conversation=conversation,
+        search_pool=search_pool,
+    )
+    for event in events:
+        if event["event"] == "final":
+            return event["content"]
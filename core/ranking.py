@@ -0,0 +1,114 @@
+import re
+
+import numpy as np
+
+from src.yelp.yelp_api import YelpAPI
+
+DEFAULT_WEIGHTS = {
+    # Bayesian average: ratings backed by few reviews are pulled towards the pool mean.
+    "prior_reviews": 25.0,
+    "open_now": 0.3,
+    "transactions": 0.2,
+    "category": 0.5,
+    "price_match": 0.3,
+    # Penalty per log(1 + km) of distance from the searched location.
+    "distance": 0.15,
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_IGNORED_TOKENS = frozenset({"or", "and", "food", "restaurant", "restaurants"})
+
+
+def _tokens(text):
+    return set(_TOKEN.findall(str(text or "").lower())) - _IGNORED_TOKENS
+
+
+def score_restaurants(restaurants, cuisine=None, price=None, transactions=None, weights=None):
+    """
+    Scores candidate restaurants in one vectorized pass over columnar arrays.
+
+    Args:
+        restaurants (list): Formatted restaurant dictionaries (or RestaurantRecords).
+        cuisine (str): Extracted cuisine; category overlap with it is boosted.
+        price (str): Extracted price name from YelpAPI.PRICE_TIERS; matching tiers are boosted.
+        transactions (iterable): Wanted transactions, e.g. {"delivery"}.
+        weights (dict): Overrides for DEFAULT_WEIGHTS.
+
+    Returns:
+        A float64 NumPy array of scores aligned with ``restaurants``.
+    """
+    w = {**DEFAULT_WEIGHTS, **(weights or {})}
+    n = len(restaurants)
+
+    rating = np.fromiter((r.get("rating") or 0.0 for r in restaurants), np.float64, n)
+    reviews = np.fromiter((r.get("review_count") or 0 for r in restaurants), np.float64, n)
+    is_open = np.fromiter((bool(r.get("is_open_now")) for r in restaurants), np.float64, n)
+    distance = np.fromiter(
+        (r.get("distance") if r.get("distance") is not None else np.nan for r in restaurants),
+        np.float64,
+        n,
+    )
+    price_tier = np.fromiter((len(r.get("price") or "") for r in restaurants), np.float64, n)
+
+    # Bayesian average rating weighted by review count.
+    total_reviews = reviews.sum()
+    prior_mean = (rating * reviews).sum() / total_reviews if total_reviews else rating.mean()
+    m = w["prior_reviews"]
+    score = (reviews * rating + m * prior_mean) / (reviews + m)
+
+    score += w["open_now"] * is_open
+    score -= w["distance"] * np.nan_to_num(np.log1p(distance / 1000.0))
+
+    wanted = _tokens(cuisine)
+    if wanted:
+        overlap = np.fromiter(
+            (bool(wanted & _tokens(" ".join(r.get("categories") or ()))) for r in restaurants),
+            np.float64,
+            n,
+        )
+        score += w["category"] * overlap
+
+    if transactions:
+        wanted_transactions = set(transactions)
+        matches = np.fromiter(
+            (len(wanted_transactions & set(r.get("transactions") or ())) for r in restaurants),
+            np.float64,
+            n,
+        )
+        score += w["transactions"] * matches / len(wanted_transactions)
+
+    if price in YelpAPI.PRICE_TIERS:
+        target = int(YelpAPI.PRICE_TIERS[price])
+        known = price_tier > 0
+        score += w["price_match"] * known * (1.0 - np.abs(price_tier - target) / 3.0)
+
+    return score
+
+
+def rank_restaurants(
+    restaurants, cuisine=None, price=None, transactions=None, k=None, weights=None
+):
+    """
+    Ranks candidate restaurants best first.
+
+    Args:
+        restaurants (list): Formatted restaurant dictionaries (or RestaurantRecords).
+        cuisine (str): Extracted cuisine used for the category boost.
+        price (str): Extracted price name used for the price-match boost.
+        transactions (iterable): Wanted transactions used for the transaction boost.
+        k (int): Number of restaurants to return; all of them when None.
+        weights (dict): Overrides for DEFAULT_WEIGHTS.
+
+    Returns:
+        The top ``k`` restaurants ordered from highest to lowest score.
+    """
+    if not restaurants:
+        return []
+    score = score_restaurants(restaurants, cuisine, price, transactions, weights)
+    k = len(restaurants) if k is None else min(k, len(restaurants))
+    if k < len(restaurants):
+        top = np.argpartition(-score, k - 1)[:k]
+    else:
+        top = np.arange(len(restaurants))
+    top = top[np.argsort(-score[top], kind="stable")]
+    return [restaurants[i] for i in top]
@@ -0,0 +1,194 @@
+"""
+# Conversation Refinement
+# This module lets follow-up messages ("cheaper ones", "show me 3 more", "what about in
+# Brooklyn") patch the previous turn's slots instead of going through the LLM, and answers
+# them from the previous turn's candidates when the new query is a subset of the old one.
+"""
+
+import re
+import threading
+
+from core.ranking import rank_restaurants
+from src.yelp.records import restaurant_key
+from src.yelp.yelp_api import YelpAPI
+
+# Price names from cheapest to most expensive.
+PRICE_ORDER = sorted(YelpAPI.PRICE_TIERS, key=lambda name: YelpAPI.PRICE_TIERS[name])
+# Longer messages are treated as new requests.
+MAX_FOLLOWUP_TOKENS = 10
+
+_NUMBER_WORDS = {
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+}
+_COUNT = r"(\d{1,2}|" + "|".join(_NUMBER_WORDS) + r")"
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_CHEAPER = re.compile(r"\b(?:cheaper|less expensive|more affordable|lower priced?|budget)\b")
+_PRICIER = re.compile(
+    r"\b(?:fancier|pricier|more expensive|more upscale|nicer|higher end|more fancy)\b"
+)
+_RESULTS = r"(?:options?|places?|ones?|results?|restaurants?|suggestions?|spots?|picks?)"
+# Explicit requests for more results: "3 more", "more options", "another one", "any others".
+# A count before "more" only counts when results or the end of the message follow it, so "one
+# more question" and "more about ..." are not read as asking for new restaurants.
+_MORE = re.compile(
+    r"\b(?:"
+    + _COUNT
+    + r"\s+more\b(?=\s+(?:[a-z]+\s+)?"
+    + _RESULTS
+    + r"\b|\s*(?:please)?\s*[.!?]*$)|more\s+"
+    + _RESULTS
+    + r"\b|(?:another|other)\s+(?:one|"
+    + _RESULTS
+    + r")\b|any\s+(?:more|others?)\b|(?:show|give)\s+me\s+more\b(?!\s+about))"
+)
+# "no more sushi", "not thai": the negated words are dropped before extracting slots.
+_NEGATED = re.compile(
+    r"\b(?:no|not|don'?t want|without)\s+(?!too\b)(?:more\s+|any\s+)?[a-z]+(?:\s+food)?",
+    re.IGNORECASE,
+)
+# "only 3", "top five", "2 cheaper ones" (matched after the price words are removed).
+_ONLY = re.compile(
+    r"\b(?:(?:only|just|top)\s+"
+    + _COUNT
+    + r"\b|"
+    + _COUNT
+    + r"\s+(?:[a-z]+\s+)?"
+    + _RESULTS
+    + r"\b)"
+)
+_FOLLOWUP = re.compile(
+    r"^(?:what|how)\s+about\b|\binstead\b|^(?:and|also|only|just|now)\b|\b(?:ones?|those|them)\b"
+)
+
+
+def _count(raw):
+    return _NUMBER_WORDS.get(raw) or int(raw)
+
+
+class Conversation:
+    """
+    Refinement state for one chat session: the last turn's slots, its ranked candidate pool
+    (before the top-k cut) and the restaurants already shown. Callers that may run turns of
+    the same session concurrently hold ``lock`` for the whole turn.
+    """
+
+    def __init__(self, max_candidates=200):
+        self.max_candidates = max_candidates
+        self.lock = threading.Lock()
+        self.slots = None
+        self.candidates = []
+        self.shown = set()
+
+    def remember(self, slots, candidates, shown, keep_shown=False):
+        """Store a finished turn; ``keep_shown`` adds to the shown set instead of replacing it."""
+        self.slots = dict(slots)
+        self.candidates = list(candidates)[: self.max_candidates]
+        shown_keys = {restaurant_key(r) for r in shown}
+        self.shown = self.shown | shown_keys if keep_shown else shown_keys
+
+    def reset(self):
+        self.slots = None
+        self.candidates = []
+        self.shown = set()
+
+
+def parse_followup(user_input, conversation: Conversation, extractor=None):
+    """
+    Interpret a message as a refinement of the previous turn.
+
+    Args:
+        user_input (str): The user's message.
+        conversation (Conversation): The session's refinement state.
+        extractor (LocalInfoExtractor): Optional rule-based extractor used to spot a new
+            cuisine, location or price in the message.
+
+    Returns:
+        None if the message should be handled as a new request, otherwise a dictionary with
+        the patched ``slots``, the set of ``changed`` slot names and ``more`` (the number of
+        additional restaurants asked for, or None).
+    """
+    if conversation.slots is None:
+        return None
+    text = user_input.lower().strip()
+    tokens = _TOKEN.findall(text)
+    if not tokens or len(tokens) > MAX_FOLLOWUP_TOKENS:
+        return None
+
+    slots = dict(conversation.slots)
+    changed = set()
+    more = None
+
+    user_input = _NEGATED.sub(" ", user_input)
+    text = _NEGATED.sub(" ", text)
+    found = {}
+    if extractor is not None:
+        info, _ = extractor.extract(user_input)
+        found = {k: info[k] for k in ("cuisine", "location", "price") if info.get(k)}
+        if "cuisine" in found and "location" in found and not _FOLLOWUP.search(text):
+            # A complete request of its own, e.g. "sushi in Boston".
+            return None
+
+    current = PRICE_ORDER.index(slots["price"]) if slots.get("price") in PRICE_ORDER else 1
+    if _CHEAPER.search(text):
+        found["price"] = PRICE_ORDER[max(current - 1, 0)]
+    elif _PRICIER.search(text):
+        found["price"] = PRICE_ORDER[min(current + 1, len(PRICE_ORDER) - 1)]
+
+    for slot, value in found.items():
+        if value != slots.get(slot):
+            slots[slot] = value
+            changed.add(slot)
+
+    # "more expensive" and "more affordable" are price changes, not requests for more results.
+    rest = _PRICIER.sub(" ", _CHEAPER.sub(" ", text))
+    match = _MORE.search(rest)
+    count = _ONLY.search(rest)
+    count = _count(count.group(1) or count.group(2)) if count else None
+    if match:
+        if match.group(1):
+            more = _count(match.group(1))
+        elif match.group(0).startswith("another"):
+            more = 1
+        else:
+            more = count or slots.get("limit") or 5
+    elif count is not None and count != slots.get("limit"):
+        slots["limit"] = count
+        changed.add("limit")
+
+    if not changed and more is None:
+        return None
+    return {"slots": slots, "changed": changed, "more": more}
+
+
+def refine_from_candidates(conversation: Conversation, refinement):
+    """
+    Answer a refinement from the previous turn's candidates when it only narrows that query:
+    a smaller or larger limit, more results, or a price tier present in the pool.
+
+    Returns:
+        The ranked restaurants, or None if the candidates cannot satisfy the refinement and a
+        new search is needed.
+    """
+    if refinement["changed"] - {"price", "limit"}:
+        return None
+    slots = refinement["slots"]
+    pool = conversation.candidates
+    wanted = refinement["more"] or slots.get("limit") or 5
+    if refinement["more"]:
+        pool = [r for r in pool if restaurant_key(r) not in conversation.shown]
+    if "price" in refinement["changed"]:
+        tier = int(YelpAPI.PRICE_TIERS.get(slots.get("price"), "2"))
+        pool = [r for r in pool if len(r.get("price") or "") == tier]
+    if len(pool) < wanted:
+        return None
+    return rank_restaurants(pool, cuisine=slots.get("cuisine"), price=slots.get("price"), k=wanted)
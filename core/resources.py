@@ -0,0 +1,191 @@
+"""
+# Shared Resources
+# This module builds the long-lived clients, caches and indexes once per process and hands
+# the same instances to every Streamlit session, rerun and API request. Each getter builds its
+# resource on first use, so heavy dependencies (LangChain, the Gemini SDK, index files) are
+# only imported and loaded when a request actually needs them.
+"""
+
+import functools
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_LOCK = threading.RLock()
+_BUILT = []
+
+
+def _singleton(factory):
+    """Cache the result of a zero-argument factory for the lifetime of the process."""
+    instance = []
+
+    @functools.wraps(factory)
+    def get():
+        if not instance:
+            with _LOCK:
+                if not instance:
+                    instance.append(factory())
+                    _BUILT.append(instance)
+        return instance[0]
+
+    return get
+
+
+def concurrency():
+    """
+    Chat requests one process serves at once (SERVER_THREADS, default 32). The shared Yelp
+    connection pool and the search and page-fetch thread pools are sized from it, so requests
+    do not queue behind each other for them.
+    """
+    return int(os.getenv("SERVER_THREADS", "32"))
+
+
+def _pool_setting(name, default):
+    return int(os.getenv(name) or default)
+
+
+@_singleton
+def get_search_pool():
+    """Returns the thread pool that fans out multi-intent Yelp searches (SEARCH_THREADS)."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    return ThreadPoolExecutor(
+        max_workers=_pool_setting("SEARCH_THREADS", concurrency()),
+        thread_name_prefix="yelp-search",
+    )
+
+
+@_singleton
+def get_yelp_client():
+    """Returns the cached Yelp client (see src.yelp.cache.CachedYelpAPI)."""
+    from src.yelp.cache import CachedYelpAPI, MemoryCacheBackend, SQLiteCacheBackend
+    from src.yelp.yelp_api import YelpAPI
+
+    cache_path = os.getenv("YELP_CACHE_PATH")
+    backend = SQLiteCacheBackend(cache_path) if cache_path else MemoryCacheBackend()
+    search_threads = _pool_setting("SEARCH_THREADS", concurrency())
+    page_workers = _pool_setting("YELP_PAGE_WORKERS", concurrency())
+    yelp = YelpAPI(
+        api_key=os.getenv("YELP_API_KEY"),
+        # Enough keep-alive connections for every search and page fetch that can be in flight.
+        pool_size=_pool_setting("YELP_POOL_SIZE", search_threads + page_workers),
+        page_workers=page_workers,
+    )
+    return CachedYelpAPI(yelp, backend=backend)
+
+
+@_singleton
+def get_cache_warmer():
+    """
+    Returns the background warmer for the Yelp cache, started, if CACHE_WARM_QUOTA (Yelp calls
+    per minute) is set; otherwise None.
+    """
+    quota = float(os.getenv("CACHE_WARM_QUOTA", "0"))
+    if quota <= 0:
+        return None
+    from src.yelp.warmer import CacheWarmer, load_seed_queries
+
+    seeds_path = os.getenv("CACHE_WARM_SEEDS")
+    warmer = CacheWarmer(
+        get_yelp_client(),
+        quota_per_minute=quota,
+        top_n=int(os.getenv("CACHE_WARM_TOP", "300")),
+        seeds=load_seed_queries(seeds_path) if seeds_path else (),
+    )
+    return warmer.start()
+
+
+@_singleton
+def get_extraction_cache():
+    """Returns the prompt extraction cache."""
+    from src.ai.cache import ExtractionCache
+
+    return ExtractionCache(semantic=os.getenv("EXTRACTION_SEMANTIC_CACHE") == "1")
+
+
+@_singleton
+def get_local_extractor():
+    """Returns the compiled rule-based extractor used before falling back to Gemini."""
+    from src.ai.local_extractor import LocalInfoExtractor
+
+    return LocalInfoExtractor()
+
+
+@_singleton
+def get_local_index():
+    """Returns the local restaurant index loaded from LOCAL_INDEX_PATHS, if configured."""
+    paths = os.getenv("LOCAL_INDEX_PATHS")
+    if not paths:
+        return None
+    from src.yelp.local_index import LocalRestaurantIndex
+
+    return LocalRestaurantIndex.from_json(*paths.split(","))
+
+
+@_singleton
+def get_chatbot():
+    """Returns the Gemini extraction bot, with its model client, prompt and chain built once."""
+    from src.ai.gemini_api import InfoExtractionChatBot
+
+    return InfoExtractionChatBot(
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        cache=get_extraction_cache(),
+        local_extractor=get_local_extractor(),
+        max_examples=int(os.getenv("EXTRACTION_EXAMPLES", "2")),
+    )
+
+
+@_singleton
+def setup_metrics():
+    """Registers cache and upstream stats with the metrics registry and the JSONL exporter."""
+    from src.net.throttle import get_upstream
+    from src.telemetry.metrics import METRICS, JSONLExporter
+
+    yelp = get_yelp_client()
+    extraction_cache = get_extraction_cache()
+    local_extractor = get_local_extractor()
+    METRICS.register_collector("yelp_cache", yelp.stats.as_dict)
+    METRICS.register_collector(
+        "extraction_cache",
+        lambda: {**extraction_cache.stats, "hit_rate": extraction_cache.hit_rate},
+    )
+    METRICS.register_collector(
+        "local_extractor",
+        lambda: {**local_extractor.stats, "served_fraction": local_extractor.served_fraction},
+    )
+    for name in ("yelp", "gemini"):
+        METRICS.register_collector(f"upstream.{name}", get_upstream(name).as_dict)
+    warmer = get_cache_warmer()
+    if warmer is not None:
+        METRICS.register_collector("cache_warmer", lambda: dict(warmer.stats))
+    if os.getenv("METRICS_JSONL_PATH"):
+        METRICS.add_exporter(JSONLExporter(os.getenv("METRICS_JSONL_PATH")))
+    return METRICS
+
+
+@_singleton
+def start_metrics_server():
+    """
+    Serves Prometheus metrics on METRICS_PORT, if set. The API server exposes /metrics itself
+    and does not call this, since its worker processes would compete for the port.
+    """
+    from src.telemetry.metrics import METRICS, PrometheusExporter
+
+    port = os.getenv("METRICS_PORT")
+    if not port:
+        return None
+    return METRICS.add_exporter(PrometheusExporter(METRICS, port=int(port)))
+
+
+def close_resources():
+    """Close every built resource that holds connections or threads; used on server shutdown."""
+    with _LOCK:
+        built = [instance[0] for instance in _BUILT]
+    # Close in reverse build order, so e.g. the warmer stops before the client it uses.
+    for resource in reversed(built):
+        close = getattr(resource, "close", None)
+        if callable(close):
+            close()
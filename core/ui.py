@@ -1,8 +1,20 @@
 import streamlit as st
 
+from core.ranking import rank_restaurants
+from src.telemetry.metrics import METRICS
+from src.yelp.records import restaurant_key
+
+# Number of most recent messages always rendered in full.
+RECENT_MESSAGES = 6
+# Number of older messages shown per page in the collapsed history.
+HISTORY_PAGE_SIZE = 10
+
 
 def render_restaurant_card(restaurant):
-    """Returns the HTML string for a single restaurant card."""
+    """
+    Returns the HTML string for a single restaurant card.
+    The map iframe sits in a collapsed <details> block so it only loads when expanded.
+    """
     # Corrected Google Maps iframe URL
     iframe_url = f"https://maps.google.com/maps?q={restaurant['address']}&output=embed"
     # Corrected Google Maps link URL
@@ -35,23 +47,25 @@ def render_restaurant_card(restaurant):
             <h4>
                 <a href="{maps_link}" target="_blank" style="text-decoration: none; color: var(--text-color);">{restaurant['name']}</a>
             </h4>
-            <div style="
-                border-radius: 8px;
-                overflow: hidden;
-                margin-top: 10px;
-                margin-bottom: 10px;
-                background-color: transparent !important;
-            ">
-                <iframe
-                    src="{iframe_url}"
-                    style="border:0;"
-                    width="100%"
-                    height="150"
-                    allowfullscreen=""
-                    loading="lazy"
-                    referrerpolicy="no-referrer">
-                </iframe>
-            </div>
+            <details style="margin-top: 10px; margin-bottom: 10px;">
+                <summary style="cursor: pointer; color: var(--text-color);">🗺️ Show map</summary>
+                <div style="
+                    border-radius: 8px;
+                    overflow: hidden;
+                    margin-top: 10px;
+                    background-color: transparent !important;
+                ">
+                    <iframe
+                        src="{iframe_url}"
+                        style="border:0;"
+                        width="100%"
+                        height="150"
+                        allowfullscreen=""
+                        loading="lazy"
+                        referrerpolicy="no-referrer">
+                    </iframe>
+                </div>
+            </details>
             <p style="margin-top: 0; color: var(--text-color);"><strong>⭐ Rating:</strong> {restaurant['rating']} ({restaurant['review_count']} reviews)</p>
             <p style="color: var(--text-color);"><strong>📍 Address:</strong> {restaurant['address']}</p>
             <p style="color: var(--text-color);"><strong>📞 Phone:</strong> {restaurant.get('phone', 'N/A')}</p>
@@ -63,40 +77,192 @@ def render_restaurant_card(restaurant):
     """
 
 
+def cached_card_html(restaurant):
+    """Returns the card HTML for a restaurant, memoized per business in the session state."""
+    cache = st.session_state.setdefault("card_html", {})
+    key = restaurant_key(restaurant)
+    html_string = cache.get(key)
+    if html_string is None:
+        METRICS.incr("ui.card_cache.misses")
+        html_string = cache[key] = render_restaurant_card(restaurant)
+    else:
+        METRICS.incr("ui.card_cache.hits")
+    return html_string
+
+
+def render_card_row(restaurants):
+    """Returns the HTML string for a horizontally scrolling row of restaurant cards."""
+    card_html = "".join([cached_card_html(r) for r in restaurants])
+    return f"""
+        <div style="
+            display: flex;
+            flex-direction: row;
+            overflow-x: auto;
+            padding: 10px 0;
+            -webkit-overflow-scrolling: touch;
+            scrollbar-width: thin;
+            scrollbar-color: #A9A9A9 #F1F0F0;
+        ">
+            {card_html}
+        </div>
+        """
+
+
+def render_bot_text(text):
+    """Returns the HTML string for a plain-text bot message."""
+    return f"""
+        <div style='background:#F1F0F0; padding:10px; border-radius:10px; margin:5px 0;'>
+            <b>Bot:</b><br>{text}
+        </div>
+        """
+
+
+def render_message(msg):
+    """Returns the list of HTML blocks that display a single chat message."""
+    if msg["role"] == "user":
+        html_string = f"""<div style='background:var(--background-color); padding:10px; border-radius:10px; margin:5px 0;'>
+            <b>You:</b><br>{msg['content']}</div>"""
+        return [html_string]
+    content = msg["content"]
+    if content.get("type") == "cards":
+        return ["### 🍴 Recommended Restaurants", render_card_row(content["data"])]
+    return [render_bot_text(content["content"])]
+
+
+def _message_html(history):
+    """
+    Returns the HTML blocks for every stored message, building only those added since the
+    last run. HTML for evicted messages and restaurants is dropped along with them.
+    """
+    rendered = st.session_state.setdefault("message_html", {})
+    blocks = []
+    for message in history:
+        html_blocks = rendered.get(message.seq)
+        if html_blocks is None:
+            html_blocks = rendered[message.seq] = render_message(history.resolve(message))
+        blocks.append(html_blocks)
+
+    if len(rendered) > len(history):
+        live = {message.seq for message in history}
+        st.session_state.message_html = {k: v for k, v in rendered.items() if k in live}
+    card_html = st.session_state.get("card_html", {})
+    if len(card_html) > len(history.restaurants):
+        st.session_state.card_html = {
+            k: v for k, v in card_html.items() if k in history.restaurants
+        }
+    return blocks
+
+
+def _show(blocks):
+    for html_string in blocks:
+        st.markdown(html_string, unsafe_allow_html=True)
+
+
 def render_chat_history():
-    """Renders the full chat history stored in Streamlit's session state."""
-    for msg in st.session_state.messages:
-        if msg["role"] == "user":
-            html_string = f"""<div style='background:var(--background-color); padding:10px; border-radius:10px; margin:5px 0;'>
-                <b>You:</b><br>{msg['content']}</div>"""
-            st.markdown(
-                html_string,
-                unsafe_allow_html=True,
+    """
+    Renders the ChatHistory stored in Streamlit's session state.
+
+    The most recent messages are rendered in full; older ones are collapsed into a paged
+    view so rerun cost stays bounded as the conversation grows.
+    """
+    with METRICS.span("ui.render_history", messages=len(st.session_state.history)):
+        _render_chat_history(st.session_state.history)
+
+
+def _render_chat_history(history):
+    rendered = _message_html(history)
+    older, recent = rendered[:-RECENT_MESSAGES], rendered[-RECENT_MESSAGES:]
+
+    if older or history.archived:
+        with st.expander(f"🕘 Earlier messages ({len(older) + history.archived})"):
+            if history.archived:
+                st.caption(f"{history.archived} older messages have been archived.")
+            pages = (len(older) + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+            page = pages
+            if pages > 1:
+                page = st.number_input(
+                    "Page", min_value=1, max_value=pages, value=pages, key="history_page"
+                )
+            start = (page - 1) * HISTORY_PAGE_SIZE
+            for blocks in older[start : start + HISTORY_PAGE_SIZE]:
+                _show(blocks)
+
+    for blocks in recent:
+        _show(blocks)
+
+
+def render_response_stream(events):
+    """
+    Renders a streamed bot response progressively and returns the final response.
+
+    Args:
+        events: An iterable of events as yielded by core.logic.chat_response_stream.
+
+    Returns:
+        The bot's final response dictionary.
+    """
+    live = st.empty()
+    with live.container():
+        status = st.empty()
+        cards = st.empty()
+    status.markdown("⏳ Understanding your request...")
+    arrived = []
+    info, limit = {}, None
+    final = None
+    for event in events:
+        if event["event"] == "extraction":
+            info, limit = event["data"], event.get("limit")
+            status.markdown(
+                f"🔎 Searching for **{info.get('cuisine') or 'restaurants'}** "
+                f"in **{info.get('location') or 'your area'}**..."
+            )
+        elif event["event"] == "partial":
+            arrived.extend(event["data"])
+            # Preview the best candidates so far; deep searches can return many pages.
+            preview = rank_restaurants(
+                arrived, cuisine=info.get("cuisine"), price=info.get("price"), k=limit
             )
-        elif msg["role"] == "bot":
-            content = msg["content"]
-            if content.get("type") == "cards":
-                st.markdown("### 🍴 Recommended Restaurants")
-                card_html = "".join([render_restaurant_card(r) for r in content["data"]])
-                html_string = f"""
-                    <div style="
-                        display: flex;
-                        flex-direction: row;
-                        overflow-x: auto;
-                        padding: 10px 0;
-                        -webkit-overflow-scrolling: touch;
-                        scrollbar-width: thin;
-                        scrollbar-color: #A9A9A9 #F1F0F0;
-                    ">
-                        {card_html}
-                    </div>
-                    """
-                st.markdown(html_string, unsafe_allow_html=True)
-            else:
-                # Corrected: Combine into a single f-string to ensure proper HTML structure
-                html_string = f"""
-                    <div style='background:#F1F0F0; padding:10px; border-radius:10px; margin:5px 0;'>
-                        <b>Bot:</b><br>{content['content']}
-                    </div>
-                    """
-                st.markdown(html_string, unsafe_allow_html=True)
+            cards.markdown(render_card_row(preview), unsafe_allow_html=True)
+        elif event["event"] == "final":
+            final = event["content"]
+    # The finished response is rendered with the rest of the chat history.
+    live.empty()
+    return final
+
+
+def _markdown_table(rows):
+    """Returns a Markdown table for a list of dictionaries sharing the same keys."""
+    header = list(rows[0])
+    lines = ["| " + " | ".join(header) + " |", "|" + " --- |" * len(header)]
+    for row in rows:
+        lines.append("| " + " | ".join(str(row[k]) for k in header) + " |")
+    return "\n".join(lines)
+
+
+def render_ops_panel(snapshot):
+    """
+    Renders a metrics snapshot (see src.telemetry.metrics.Metrics.snapshot): per-stage
+    latency percentiles in milliseconds, then counters such as cache hits and upstream calls.
+    """
+    histograms = snapshot["histograms"]
+    if histograms:
+        st.markdown("**⏱️ Stage latency (ms) and payload sizes (bytes)**")
+        rows = [
+            {
+                "stage": name,
+                "count": summary["count"],
+                **{k: round(summary[k], 1) for k in ("p50", "p95", "p99", "max")},
+            }
+            for name, summary in sorted(histograms.items())
+        ]
+        st.markdown(_markdown_table(rows))
+    counters = snapshot["counters"]
+    if counters:
+        st.markdown("**🔢 Counters**")
+        rows = [
+            {"metric": name, "value": round(value, 3) if isinstance(value, float) else value}
+            for name, value in sorted(counters.items())
+        ]
+        st.markdown(_markdown_table(rows))
+    if not histograms and not counters:
+        st.caption("No requests recorded yet.")
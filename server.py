@@ -0,0 +1,270 @@
+"""
+# Headless API Server
+# An ASGI application exposing the recommender as JSON endpoints for non-browser clients:
+#
+#     POST /chat          {"message": "..."} -> {"response": {...}}
+#     POST /chat/stream   {"message": "..."} -> NDJSON progress events (see chat_response_stream)
+#
+# Both chat endpoints accept an optional "session_id"; requests sharing one are treated as a
+# conversation, so follow-ups like "cheaper ones" refine the previous answer.
+#     GET  /healthz       liveness probe
+#     GET  /metrics       Prometheus text metrics
+#
+# Clients, caches and the local index are built once per worker process and shared by every
+# request. The pipeline runs on a bounded thread pool so the event loop stays free to accept
+# connections while requests wait on Gemini and Yelp.
+#
+# Usage:
+#     python server.py                         # SERVER_WORKERS processes on PORT (default 8000)
+#     uvicorn server:app --workers 4
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+
+from core import resources
+from core.logic import chat_response, chat_response_stream
+from core.refine import Conversation
+from src.telemetry.metrics import METRICS, to_prometheus
+from src.yelp.records import RestaurantRecord
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_BUDGET = int(os.getenv("CANDIDATE_BUDGET", "0")) or None
+SERVER_THREADS = resources.concurrency()
+MAX_SESSIONS = int(os.getenv("SERVER_MAX_SESSIONS", "10000"))
+MAX_BODY_BYTES = 64 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _dumps(value):
+    return orjson.dumps(value, default=RestaurantRecord.to_dict)
+
+
+class RecommenderApp:
+    """The ASGI application; one instance per worker process."""
+
+    def __init__(self, threads=SERVER_THREADS, max_sessions=MAX_SESSIONS):
+        self.threads = threads
+        self.max_sessions = max_sessions
+        self.executor = None
+        self.gemini = None
+        self.yelp = None
+        self.local_index = None
+        self.search_pool = None
+        # Least recently used sessions are evicted first.
+        self.sessions = OrderedDict()
+        self._sessions_lock = threading.Lock()
+
+    # --- Lifecycle ---
+
+    def startup(self):
+        """Build the long-lived clients, caches and thread pool shared by all requests."""
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="chat")
+        self.gemini = resources.get_chatbot()
+        self.yelp = resources.get_yelp_client()
+        self.local_index = resources.get_local_index()
+        self.search_pool = resources.get_search_pool()
+        resources.setup_metrics()
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        resources.close_resources()
+
+    # --- ASGI ---
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        try:
+            await self._route(scope, receive, send)
+        except HTTPError as e:
+            await self._send_json(send, e.status, {"error": e.message})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await asyncio.to_thread(self.startup)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _route(self, scope, receive, send):
+        method, path = scope["method"], scope["path"].rstrip("/") or "/"
+        if path == "/healthz":
+            await self._send_json(send, 200, {"status": "ok"})
+        elif path == "/metrics":
+            body = to_prometheus(METRICS.snapshot()).encode()
+            await self._send(send, 200, body, b"text/plain; version=0.0.4")
+        elif path == "/chat":
+            self._require_post(method)
+            message, session_id = await self._read_message(receive)
+            try:
+                with METRICS.span("server.chat"):
+                    response = await self._run(chat_response, message, session_id)
+            except Exception as e:
+                logger.exception("Chat request failed")
+                raise HTTPError(502, "Upstream request failed") from e
+            await self._send_json(send, 200, {"response": response})
+        elif path == "/chat/stream":
+            self._require_post(method)
+            message, session_id = await self._read_message(receive)
+            await self._stream(send, message, session_id)
+        else:
+            raise HTTPError(404, "Not found")
+
+    @staticmethod
+    def _require_post(method):
+        if method != "POST":
+            raise HTTPError(405, "Use POST")
+
+    async def _read_message(self, receive):
+        body = bytearray()
+        while True:
+            event = await receive()
+            body += event.get("body", b"")
+            if len(body) > MAX_BODY_BYTES:
+                raise HTTPError(413, "Request body too large")
+            if not event.get("more_body"):
+                break
+        try:
+            payload = orjson.loads(body)
+            message, session_id = payload.get("message"), payload.get("session_id")
+        except (orjson.JSONDecodeError, AttributeError):
+            raise HTTPError(400, "Body must be a JSON object") from None
+        if not isinstance(message, str) or not message.strip():
+            raise HTTPError(400, "Field 'message' must be a non-empty string")
+        if session_id is not None and not isinstance(session_id, str):
+            raise HTTPError(400, "Field 'session_id' must be a string")
+        return message, session_id
+
+    def _conversation(self, session_id):
+        """Return the session's Conversation, creating it (and evicting the oldest) if new."""
+        if session_id is None:
+            return None
+        with self._sessions_lock:
+            conversation = self.sessions.get(session_id)
+            if conversation is None:
+                conversation = self.sessions[session_id] = Conversation()
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+            else:
+                self.sessions.move_to_end(session_id)
+            return conversation
+
+    def _pipeline_kwargs(self, session_id):
+        return {
+            "local_index": self.local_index,
+            "candidate_budget": CANDIDATE_BUDGET,
+            "conversation": self._conversation(session_id),
+            "search_pool": self.search_pool,
+        }
+
+    @staticmethod
+    def _session_turn(kwargs):
+        """Serialise overlapping requests of one session; sessionless requests run freely."""
+        conversation = kwargs["conversation"]
+        return conversation.lock if conversation is not None else contextlib.nullcontext()
+
+    async def _run(self, fn, message, session_id):
+        loop = asyncio.get_running_loop()
+        kwargs = self._pipeline_kwargs(session_id)
+
+        def _call():
+            with self._session_turn(kwargs):
+                return fn(message, self.gemini, self.yelp, **kwargs)
+
+        return await loop.run_in_executor(self.executor, _call)
+
+    async def _stream(self, send, message, session_id):
+        """Send chat_response_stream events as newline-delimited JSON as they are produced."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+
+        kwargs = self._pipeline_kwargs(session_id)
+
+        def _produce():
+            try:
+                with self._session_turn(kwargs):
+                    events = chat_response_stream(message, self.gemini, self.yelp, **kwargs)
+                    for event in events:
+                        loop.call_soon_threadsafe(queue.put_nowait, event)
+            except Exception:
+                logger.exception("Streaming chat request failed")
+                error = {"event": "error", "error": "Upstream request failed"}
+                loop.call_soon_threadsafe(queue.put_nowait, error)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = loop.run_in_executor(self.executor, _produce)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/x-ndjson")],
+            }
+        )
+        while True:
+            event = await queue.get()
+            if event is done:
+                break
+            body = _dumps(event) + b"\n"
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+        await producer
+
+    async def _send_json(self, send, status, payload):
+        await self._send(send, status, _dumps(payload), b"application/json")
+
+    @staticmethod
+    async def _send(send, status, body, content_type):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", content_type),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+app = RecommenderApp()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "server:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1))),
+    )
@@ -0,0 +1,154 @@
+"""
+# Extraction Cache
+# This module caches InfoExtractionChatBot results so repeated prompts skip the LLM round trip.
+# It has an exact tier keyed on the normalized prompt and an optional near-duplicate tier that
+# compares hashed character n-gram vectors with cosine similarity.
+"""
+
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER_TOKEN = re.compile(
+    r"\b(?:\d+|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|dozen|a couple)\b"
+)
+
+
+def normalize_prompt(prompt):
+    """Lowercase a prompt, drop punctuation and collapse whitespace."""
+    text = _NON_WORD.sub(" ", str(prompt or "").lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def number_tokens(normalized_prompt):
+    """Return the numerals and number words of a normalized prompt, in order."""
+    return tuple(_NUMBER_TOKEN.findall(normalized_prompt))
+
+
+class HashedNgramVectorizer:
+    """
+    Turns text into L2-normalized vectors of hashed character n-gram counts.
+
+    Hashing keeps the vocabulary fixed-size, so no fitting step is needed and vectors from
+    different processes are comparable.
+    """
+
+    def __init__(self, n=3, dim=4096):
+        self.n = n
+        self.dim = dim
+
+    def transform(self, text):
+        """Return a float32 unit vector for already-normalized text."""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        padded = f" {text} "
+        for i in range(max(len(padded) - self.n + 1, 1)):
+            gram = padded[i : i + self.n].encode("utf-8")
+            vector[zlib.crc32(gram) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector
+
+
+class ExtractionCache:
+    """
+    Two-tier cache for prompt extraction results.
+
+    The exact tier is an LRU dict on the normalized prompt. The optional semantic tier keeps a
+    fixed-size matrix of prompt vectors and returns the result of the most similar stored
+    prompt when its cosine similarity is at least ``threshold`` and both prompts contain the
+    same numbers (n-gram similarity cannot tell "3 restaurants" from "8 restaurants"); its
+    slots are reused oldest first once full.
+    """
+
+    def __init__(
+        self,
+        max_entries=2048,
+        semantic=False,
+        threshold=0.95,
+        max_semantic_entries=2048,
+        vectorizer=None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Capacity of the exact tier.
+            semantic (bool): Enable the near-duplicate tier.
+            threshold (float): Minimum cosine similarity for a near-duplicate hit.
+            max_semantic_entries (int): Capacity of the near-duplicate tier.
+            vectorizer (HashedNgramVectorizer): Vectorizer used by the near-duplicate tier.
+        """
+        self.max_entries = max_entries
+        self.semantic = semantic
+        self.threshold = threshold
+        self.max_semantic_entries = max_semantic_entries
+        self.vectorizer = vectorizer or HashedNgramVectorizer()
+        self._exact = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0}
+        if semantic:
+            self._matrix = np.zeros((max_semantic_entries, self.vectorizer.dim), dtype=np.float32)
+            self._values = [None] * max_semantic_entries
+            self._numbers = [None] * max_semantic_entries
+            self._size = 0
+            self._next_slot = 0
+
+    def get(self, prompt):
+        """Return a cached result for the prompt, or None on a miss."""
+        key = normalize_prompt(prompt)
+        with self._lock:
+            result = self._exact.get(key)
+            if result is not None:
+                self._exact.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return dict(result)
+            if self.semantic and self._size:
+                scores = self._matrix[: self._size] @ self.vectorizer.transform(key)
+                numbers = number_tokens(key)
+                above = np.flatnonzero(scores >= self.threshold)
+                for slot in above[np.argsort(-scores[above])]:
+                    if self._numbers[slot] == numbers:
+                        self.stats["semantic_hits"] += 1
+                        return dict(self._values[slot])
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, prompt, result):
+        """Store an extraction result for the prompt."""
+        key = normalize_prompt(prompt)
+        with self._lock:
+            is_new = key not in self._exact
+            self._exact[key] = dict(result)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+                self.stats["evictions"] += 1
+            if self.semantic and is_new:
+                slot = self._next_slot
+                self._matrix[slot] = self.vectorizer.transform(key)
+                self._values[slot] = dict(result)
+                self._numbers[slot] = number_tokens(key)
+                self._next_slot = (slot + 1) % self.max_semantic_entries
+                self._size = min(self._size + 1, self.max_semantic_entries)
+
+    def clear(self):
+        with self._lock:
+            self._exact.clear()
+            if self.semantic:
+                self._size = 0
+                self._next_slot = 0
+
+    @property
+    def hit_rate(self):
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        lookups = hits + self.stats["misses"]
+        return hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._exact)
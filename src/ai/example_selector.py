@@ -0,0 +1,48 @@
+"""
+# Example Selector
+# This module picks the few-shot examples most similar to a user prompt, so the extraction
+# prompt only carries the examples that help with it instead of the whole set. Similarity is
+# the cosine of hashed character n-gram vectors, computed locally with no model call.
+"""
+
+import threading
+
+import numpy as np
+from langchain_core.example_selectors import BaseExampleSelector
+
+from src.ai.cache import HashedNgramVectorizer, normalize_prompt
+
+
+class NgramExampleSelector(BaseExampleSelector):
+    """
+    Selects the ``k`` examples whose ``input_key`` text is closest to the prompt.
+
+    Example vectors are computed once when examples are added; selecting is one matrix-vector
+    product. Selected examples keep their original order so the prompt stays stable.
+    """
+
+    def __init__(self, examples, k=2, input_key="user_prompt", vectorizer=None):
+        self.k = k
+        self.input_key = input_key
+        self.vectorizer = vectorizer or HashedNgramVectorizer()
+        self.examples = []
+        self._vectors = np.zeros((0, self.vectorizer.dim), dtype=np.float32)
+        self._lock = threading.Lock()
+        for example in examples:
+            self.add_example(example)
+
+    def add_example(self, example):
+        vector = self.vectorizer.transform(normalize_prompt(example[self.input_key]))
+        with self._lock:
+            self.examples.append(example)
+            self._vectors = np.vstack([self._vectors, vector])
+
+    def select_examples(self, input_variables):
+        if self.k >= len(self.examples):
+            return list(self.examples)
+        if self.k <= 0:
+            return []
+        query = self.vectorizer.transform(normalize_prompt(input_variables[self.input_key]))
+        scores = self._vectors @ query
+        best = np.argpartition(-scores, self.k - 1)[: self.k]
+        return [self.examples[i] for i in sorted(best)]
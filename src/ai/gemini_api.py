@@ -2,75 +2,288 @@ import json
 import os
 import re
 
-from langchain.output_parsers import ResponseSchema, StructuredOutputParser
 from langchain.prompts import FewShotPromptTemplate, PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.rate_limiters import BaseRateLimiter
+from langchain_core.runnables import RunnableLambda
+
+from src.ai.cache import ExtractionCache, normalize_prompt
+from src.ai.example_selector import NgramExampleSelector
+from src.ai.local_extractor import LocalInfoExtractor
+from src.net.throttle import Upstream, get_upstream
+from src.telemetry.metrics import METRICS
+
+# Extracted fields; the prompt asks for exactly these keys and parsed results always have them.
+EXTRACTION_FIELDS = ("cuisine", "location", "price", "limit")
+# An extraction is one short JSON object; this caps runaway generations.
+MAX_OUTPUT_TOKENS = 128
+
+# --- Few-shot examples ---
+# Only the most similar ones are sent with each prompt (see NgramExampleSelector).
+EXAMPLES = [
+    {
+        "user_prompt": "Find me a cheap sushi place in San Francisco",
+        "output": '{{"cuisine": "sushi", "location": "San Francisco", "price": "cheap", "limit": 5}}',
+    },
+    {
+        "user_prompt": "I want Italian food in New York, not too expensive (3 restaurants)",
+        "output": '{{"cuisine": "Italian", "location": "New York", "price": "moderate", "limit": 3}}',
+    },
+    {
+        "user_prompt": "Recommend a fancy French restaurant in Paris for a special occasion (2 restaurants)",
+        "output": '{{"cuisine": "French", "location": "Paris", "price": "expensive", "limit": 2}}',
+    },
+    {
+        "user_prompt": "Recommend a desi indian restaurant in Paris 4 restaurants",
+        "output": '{{"cuisine": "Indian", "location": "Paris", "price": "very expensive", "limit": 4}}',
+    },
+    {
+        "user_prompt": "Somewhere for thai or ramen around Seattle or Portland",
+        "output": '{{"cuisine": "Thai or ramen", "location": "Seattle or Portland", "price": null, "limit": 5}}',
+    },
+]
+
+
+def _complete(result):
+    """Give a parsed extraction every field in EXTRACTION_FIELDS, dropping any others."""
+    if not isinstance(result, dict):
+        raise OutputParserException(f"Expected a JSON object, got: {result!r}")
+    return {field: result.get(field) for field in EXTRACTION_FIELDS}
+
+
+def _record_usage(message):
+    """Record the token counts reported for one model call and pass the message on."""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        METRICS.observe("gemini.tokens.input", usage.get("input_tokens", 0))
+        METRICS.observe("gemini.tokens.output", usage.get("output_tokens", 0))
+    return message
+
+
+class TokenBucketRateLimiter(BaseRateLimiter):
+    """Adapts an upstream's adaptive TokenBucket to LangChain's rate limiter interface."""
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def acquire(self, *, blocking=True):
+        return self.bucket.acquire(blocking=blocking)
+
+    async def aacquire(self, *, blocking=True):
+        return await self.bucket.aacquire(blocking=blocking)
 
 
 class InfoExtractionChatBot:
     """
-    Extracts cuisine, location, and price from user prompt using few-shot learning.
-    Returns dict with keys: cuisine, location, price
+    Extracts cuisine, location, price and limit from user prompt using few-shot learning.
+    Returns dict with keys: cuisine, location, price, limit
     """
 
-    def __init__(self, api_key=None, model_name="gemini-1.5-flash"):
+    def __init__(
+        self,
+        api_key=None,
+        model_name="gemini-1.5-flash",
+        cache: ExtractionCache = None,
+        local_extractor: LocalInfoExtractor = None,
+        requests_per_second=None,
+        upstream: Upstream = None,
+        llm=None,
+        max_examples=2,
+    ):
+        self.cache = cache
+        self.local_extractor = local_extractor
         self.llm_api_key = api_key or os.getenv("GOOGLE_API_KEY")
-        self.llm = ChatGoogleGenerativeAI(
-            model=model_name,
-            google_api_key=self.llm_api_key,
-            temperature=0,
-        )
 
-        # --- Define JSON schema for output ---
-        response_schemas = [
-            ResponseSchema(name="cuisine", description="Type of cuisine"),
-            ResponseSchema(name="location", description="City or location"),
-            ResponseSchema(name="price", description="Price category (cheap, moderate, expensive)"),
-        ]
-        self.output_parser = StructuredOutputParser.from_response_schemas(response_schemas)
-
-        # --- Few-shot examples ---
-        examples = [
-            {
-                "user_prompt": "Find me a cheap sushi place in San Francisco",
-                "output": '{{"cuisine": "sushi", "location": "San Francisco", "price": "cheap", "limit": 5}}',
-            },
-            {
-                "user_prompt": "I want Italian food in New York, not too expensive (3 restaurants)",
-                "output": '{{"cuisine": "Italian", "location": "New York", "price": "moderate", "limit": 3}}',
-            },
-            {
-                "user_prompt": "Recommend a fancy French restaurant in Paris for a special occasion (2 restaurants)",
-                "output": '{{"cuisine": "French", "location": "Paris", "price": "expensive", "limit": 2}}',
-            },
-            {
-                "user_prompt": "Recommend a desi indian restaurant in Paris 4 restaurants",
-                "output": '{{"cuisine": "Indian", "location": "Paris", "price": "very expensive", "limit": 4}}',
-            },
-        ]
+        # --- Client-side throttle shared by every call on this model ---
+        # The shared "gemini" upstream takes its quota from GEMINI_RATE_LIMIT / GEMINI_BURST;
+        # requests_per_second gives this bot its own bucket instead.
+        if upstream is None:
+            if requests_per_second:
+                upstream = Upstream("gemini", rate=requests_per_second)
+            else:
+                upstream = get_upstream("gemini")
+        self.upstream = upstream
+        self.rate_limiter = TokenBucketRateLimiter(upstream.bucket)
+
+        # Any LangChain chat model can stand in for Gemini, e.g. a fake one in benchmarks.
+        # The Gemini client already retries 429/5xx internally (without taking bucket tokens),
+        # so the upstream only retries for other models; stacking both multiplies calls.
+        self.retries = None if llm is not None else 0
+        if llm is None:
+            # Deferred: the Gemini SDK is the slowest import in the app.
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            llm = ChatGoogleGenerativeAI(
+                model=model_name,
+                google_api_key=self.llm_api_key,
+                temperature=0,
+                max_output_tokens=MAX_OUTPUT_TOKENS,
+                rate_limiter=self.rate_limiter,
+            )
+        elif getattr(llm, "rate_limiter", None) is None and hasattr(llm, "rate_limiter"):
+            # Injected chat models share the same bucket.
+            llm.rate_limiter = self.rate_limiter
+        self.llm = llm
+        # Models without a rate limiter hook take their bucket token in the upstream instead.
+        self.throttle = getattr(llm, "rate_limiter", None) is not self.rate_limiter
+
+        # --- Compact JSON output, parsed as JSON (fenced or bare) ---
+        self.output_parser = JsonOutputParser()
 
         example_prompt = PromptTemplate(
             input_variables=["user_prompt", "output"],
             template="User: {user_prompt}\nExtracted: {output}",
         )
 
+        # max_examples bounds the prompt size; pass len(EXAMPLES) to always send them all.
+        self.example_selector = NgramExampleSelector(EXAMPLES, k=max_examples)
         self.prompt = FewShotPromptTemplate(
-            examples=examples,
+            example_selector=self.example_selector,
             example_prompt=example_prompt,
             prefix=(
-                "Extract cuisine, location, suggestion count(limit) and price from the user prompt. "
-                "Respond only with JSON in the following format:\n"
-                '{{"cuisine": "###", "location": "###", "price": "###", "limit": "###"}}\n'
+                "Extract cuisine, location, price (cheap, moderate, expensive, very expensive) "
+                "and limit (number of restaurants, default 5) as JSON. Join several cuisines or "
+                "locations with ' or '; use null if unknown.\n"
+                '{{"cuisine": str, "location": str, "price": str|null, "limit": int}}\n'
             ),
             suffix="User: {user_prompt}\nExtracted:",
             input_variables=["user_prompt"],
         )
 
-        # --- Chain with enforced JSON output ---
-        self.chain = self.prompt | self.llm | self.output_parser
+        # --- Chain: prompt -> model (token usage recorded) -> JSON ---
+        self.chain = (
+            self.prompt
+            | self.llm
+            | RunnableLambda(_record_usage)
+            | self.output_parser
+            | RunnableLambda(_complete)
+        )
+        # The chain under the upstream's policy (coalescing, 429 backoff, adaptive rate), for
+        # single prompts and batches alike.
+        self.guarded_chain = RunnableLambda(self._invoke, afunc=self._ainvoke)
+
+    def _invoke(self, inputs):
+        return self.upstream.call(
+            normalize_prompt(inputs["user_prompt"]),
+            lambda: self.chain.invoke(inputs),
+            throttle=self.throttle,
+            retries=self.retries,
+        )
+
+    async def _ainvoke(self, inputs):
+        return await self.upstream.acall(
+            normalize_prompt(inputs["user_prompt"]),
+            lambda: self.chain.ainvoke(inputs),
+            throttle=self.throttle,
+            retries=self.retries,
+        )
 
     def get_info_from_prompt(self, user_prompt: str):
         """
         Get structured info from user prompt.
+        Repeat prompts are answered from the extraction cache when one is configured, and
+        simple prompts from the local extractor when it is confident enough. Identical prompts
+        in flight share one model call, and 429/5xx errors are retried with backoff.
+        """
+        info = self._resolve_without_llm(user_prompt)
+        if info is not None:
+            return info
+
+        METRICS.incr("extraction.llm")
+        with METRICS.span("gemini.extract"):
+            result = self._invoke({"user_prompt": user_prompt})
+        self._remember(user_prompt, result)
+        return result
+
+    def _resolve_without_llm(self, user_prompt: str):
+        """Answer a prompt from the cache or the local extractor, or return None."""
+        if self.cache is not None:
+            cached = self.cache.get(user_prompt)
+            if cached is not None:
+                METRICS.incr("extraction.cached")
+                return cached
+
+        if self.local_extractor is not None:
+            info = self.local_extractor.try_extract(user_prompt)
+            if info is not None:
+                METRICS.incr("extraction.local")
+            return info
+        return None
+
+    def _remember(self, user_prompt: str, result):
+        if self.cache is not None and result:
+            self.cache.set(user_prompt, result)
+
+    def _split_batch(self, prompts):
+        """Split prompts into locally resolved results and (index, prompt) pairs for the LLM."""
+        resolved, pending = [], []
+        for i, prompt in enumerate(prompts):
+            info = self._resolve_without_llm(prompt)
+            if info is not None:
+                resolved.append((i, info))
+            else:
+                pending.append((i, prompt))
+        return resolved, pending
+
+    def iter_info_many(self, prompts, max_concurrency=8):
+        """
+        Extract info for many prompts, yielding (index, result) pairs as they finish.
+
+        Prompts answered by the cache or the local extractor are yielded first. The rest run
+        through the upstream-guarded chain with at most ``max_concurrency`` calls in flight.
+        A failing prompt yields its exception instead of a dict, so one bad model response
+        (e.g. an OutputParserException) does not sink the batch.
+        """
+        resolved, pending = self._split_batch(prompts)
+        yield from resolved
+        if not pending:
+            return
+
+        METRICS.incr("extraction.llm", len(pending))
+        inputs = [{"user_prompt": prompt} for _, prompt in pending]
+        for j, result in self.guarded_chain.batch_as_completed(
+            inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True
+        ):
+            i, prompt = pending[j]
+            if not isinstance(result, Exception):
+                self._remember(prompt, result)
+            yield i, result
+
+    def get_info_many(self, prompts, max_concurrency=8):
+        """
+        Extract info for many prompts concurrently.
+        Returns a list aligned with ``prompts``; failed items hold their exception.
+        """
+        results = [None] * len(prompts)
+        for i, result in self.iter_info_many(prompts, max_concurrency=max_concurrency):
+            results[i] = result
+        return results
+
+    async def aiter_info_many(self, prompts, max_concurrency=8):
+        """Async counterpart of ``iter_info_many`` built on ``abatch_as_completed``."""
+        resolved, pending = self._split_batch(prompts)
+        for item in resolved:
+            yield item
+        if not pending:
+            return
+
+        METRICS.incr("extraction.llm", len(pending))
+        inputs = [{"user_prompt": prompt} for _, prompt in pending]
+        async for j, result in self.guarded_chain.abatch_as_completed(
+            inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True
+        ):
+            i, prompt = pending[j]
+            if not isinstance(result, Exception):
+                self._remember(prompt, result)
+            yield i, result
+
+    async def aget_info_many(self, prompts, max_concurrency=8):
+        """
+        Extract info for many prompts concurrently on the event loop.
+        Returns a list aligned with ``prompts``; failed items hold their exception.
         """
-        return self.chain.invoke({"user_prompt": user_prompt})
+        results = [None] * len(prompts)
+        async for i, result in self.aiter_info_many(prompts, max_concurrency=max_concurrency):
+            results[i] = result
+        return results
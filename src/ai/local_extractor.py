@@ -0,0 +1,403 @@
+"""
+# Local Info Extractor
+# This module provides a deterministic, rule-based extractor for simple restaurant prompts.
+# It recognizes cuisine, location, price and limit without calling the LLM and reports a
+# confidence score so the caller can decide whether to fall back to Gemini.
+"""
+
+import re
+
+from src.yelp.yelp_api import YelpAPI
+
+CUISINES = {
+    "american": "American",
+    "bbq": "BBQ",
+    "barbecue": "BBQ",
+    "brazilian": "Brazilian",
+    "breakfast": "breakfast",
+    "brunch": "brunch",
+    "burger": "burgers",
+    "burgers": "burgers",
+    "cafe": "cafe",
+    "chinese": "Chinese",
+    "dim sum": "dim sum",
+    "desi": "Indian",
+    "ethiopian": "Ethiopian",
+    "french": "French",
+    "german": "German",
+    "greek": "Greek",
+    "indian": "Indian",
+    "italian": "Italian",
+    "japanese": "Japanese",
+    "korean": "Korean",
+    "korean bbq": "Korean BBQ",
+    "lebanese": "Lebanese",
+    "mediterranean": "Mediterranean",
+    "mexican": "Mexican",
+    "middle eastern": "Middle Eastern",
+    "pho": "pho",
+    "pizza": "pizza",
+    "ramen": "ramen",
+    "seafood": "seafood",
+    "spanish": "Spanish",
+    "steak": "steakhouse",
+    "steakhouse": "steakhouse",
+    "sushi": "sushi",
+    "taco": "tacos",
+    "tacos": "tacos",
+    "tapas": "tapas",
+    "thai": "Thai",
+    "turkish": "Turkish",
+    "vegan": "vegan",
+    "vegetarian": "vegetarian",
+    "vietnamese": "Vietnamese",
+}
+
+LOCATIONS = {
+    "amsterdam": "Amsterdam",
+    "atlanta": "Atlanta",
+    "austin": "Austin",
+    "barcelona": "Barcelona",
+    "berlin": "Berlin",
+    "boston": "Boston",
+    "brooklyn": "Brooklyn",
+    "chicago": "Chicago",
+    "dallas": "Dallas",
+    "denver": "Denver",
+    "houston": "Houston",
+    "las vegas": "Las Vegas",
+    "london": "London",
+    "los angeles": "Los Angeles",
+    "madrid": "Madrid",
+    "manhattan": "Manhattan",
+    "miami": "Miami",
+    "montreal": "Montreal",
+    "new orleans": "New Orleans",
+    "new york": "New York",
+    "new york city": "New York",
+    "nyc": "New York",
+    "oakland": "Oakland",
+    "paris": "Paris",
+    "philadelphia": "Philadelphia",
+    "portland": "Portland",
+    "rome": "Rome",
+    "san diego": "San Diego",
+    "san francisco": "San Francisco",
+    "san jose": "San Jose",
+    "seattle": "Seattle",
+    "sf": "San Francisco",
+    "sydney": "Sydney",
+    "tokyo": "Tokyo",
+    "toronto": "Toronto",
+    "vancouver": "Vancouver",
+    "washington dc": "Washington, DC",
+}
+
+# Abbreviations that are also common lowercase words ("la" in "Chez la Femme", "la jolla"),
+# matched only in their exact case.
+CASE_SENSITIVE_LOCATIONS = {
+    "LA": "Los Angeles",
+}
+
+# Keyword -> YelpAPI.PRICE_TIERS name. Longer phrases win over their substrings.
+PRICE_KEYWORDS = {
+    "affordable": "cheap",
+    "budget": "cheap",
+    "cheap": "cheap",
+    "inexpensive": "cheap",
+    "low cost": "cheap",
+    "mid range": "moderate",
+    "moderate": "moderate",
+    "moderately priced": "moderate",
+    "not too expensive": "moderate",
+    "reasonably priced": "moderate",
+    "expensive": "expensive",
+    "fancy": "expensive",
+    "pricey": "expensive",
+    "upscale": "expensive",
+    "fine dining": "very expensive",
+    "luxury": "very expensive",
+    "very expensive": "very expensive",
+}
+assert set(PRICE_KEYWORDS.values()) <= set(YelpAPI.PRICE_TIERS)
+
+NUMBER_WORDS = {
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+}
+
+# Words that usually mean the prompt needs more than slot filling.
+AMBIGUITY_MARKERS = frozenset({"or", "not", "except", "without", "but", "near", "between"})
+# Negations ("don't" tokenizes as "don", "t"): a keyword after one may be excluded rather than
+# requested ("no fancy places"), which slot filling cannot tell apart.
+NEGATION_MARKERS = frozenset(
+    {"no", "not", "nothing", "none", "never", "nor", "neither", "without", "avoid", "hate"}
+    | {"don", "dont", "doesn", "didn", "isn", "aren", "won", "wouldn"}
+)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_NUMBER_TOKEN = r"\d{1,2}|" + "|".join(NUMBER_WORDS)
+# A count is a number followed by a results noun; "group of six", "table for 4" are party sizes.
+_NUMBER = re.compile(
+    r"(?<!\bof )(?<!\bfor )\b(?:top\s+)?(" + _NUMBER_TOKEN + r")\b(?=(?:\s+\w+){0,3}?\s+"
+    r"(?:restaurants?|places?|spots?|options?|suggestions?|recommendations?)\b)"
+)
+_BARE_NUMBER = re.compile(r"\b(?:\d+|" + "|".join(NUMBER_WORDS) + r")\b")
+_IN_LOCATION = re.compile(r"\b(?:in|at|around)\s+((?:[A-Z][\w'.-]*)(?:\s+[A-Z][\w'.-]*){0,3})")
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher over word tokens.
+
+    Patterns are phrases of one or more words; matching runs in a single pass over the token
+    stream regardless of how many patterns are compiled.
+    """
+
+    def __init__(self, patterns):
+        """
+        Compile the automaton.
+
+        Args:
+            patterns (dict): Lowercase phrase -> value returned on a match.
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for phrase, value in patterns.items():
+            self._add(phrase.split(), value)
+        self._build_failure_links()
+
+    def _add(self, words, value):
+        state = 0
+        for word in words:
+            nxt = self._goto[state].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][word] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append((len(words), value))
+
+    def _build_failure_links(self):
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for word, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(word, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def find_all(self, tokens):
+        """Return (start, end, value) for every pattern occurrence in a token list."""
+        matches = []
+        state = 0
+        for i, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for length, value in self._output[state]:
+                matches.append((i - length + 1, i + 1, value))
+        return matches
+
+    def find_longest(self, tokens):
+        """Return non-overlapping matches, preferring the longest phrase at each position."""
+        chosen = []
+        taken = set()
+        for start, end, value in sorted(self.find_all(tokens), key=lambda m: (m[0] - m[1], m[0])):
+            span = range(start, end)
+            if taken.isdisjoint(span):
+                taken.update(span)
+                chosen.append((start, end, value))
+        return sorted(chosen)
+
+
+class LocalInfoExtractor:
+    """
+    Extracts cuisine, location, price and limit from simple prompts without an LLM.
+    Returns (dict with keys: cuisine, location, price, limit; confidence in [0, 1]).
+
+    Prompts that slot filling gets wrong must be left to the LLM (run these with
+    ``python -m pytest --doctest-modules src/ai/local_extractor.py``):
+
+    >>> extractor = LocalInfoExtractor()
+    >>> deferred = [
+    ...     "I don't want sushi, find me ramen in SF",
+    ...     "sushi in SF, no fancy places",
+    ...     "I don't want anything fancy, sushi in Boston",
+    ...     "italian in nyc, nothing too pricey",
+    ...     "sushi in san francisco under 20 dollars",
+    ...     "sushi in Boston tonight at 8",
+    ...     "We are a group of six looking for vegan options around Boston",
+    ...     "a sushi place in Tokyo for two",
+    ... ]
+    >>> [prompt for prompt in deferred if extractor.try_extract(prompt) is not None]
+    []
+    >>> extractor.try_extract("cheap sushi in SF")
+    {'cuisine': 'sushi', 'location': 'San Francisco', 'price': 'cheap', 'limit': 5}
+    >>> extractor.try_extract("top three sushi places in Boston")["limit"]
+    3
+    >>> [extractor.extract(prompt)[0]["cuisine"] for prompt in ("vegan pizza in Austin",
+    ...     "breakfast tacos in Austin", "sushi, ramen or thai in Seattle")]
+    ['vegan pizza', 'breakfast tacos', 'sushi or ramen or Thai']
+    """
+
+    def __init__(
+        self,
+        cuisines=None,
+        locations=None,
+        price_keywords=None,
+        default_limit=5,
+        min_confidence=0.8,
+    ):
+        self.cuisines = AhoCorasick(cuisines or CUISINES)
+        self.locations = AhoCorasick(locations or LOCATIONS)
+        self.case_sensitive_locations = re.compile(
+            r"\b(" + "|".join(map(re.escape, CASE_SENSITIVE_LOCATIONS)) + r")\b"
+        )
+        self.prices = AhoCorasick(price_keywords or PRICE_KEYWORDS)
+        self.default_limit = default_limit
+        self.min_confidence = min_confidence
+        self.stats = {"served": 0, "deferred": 0}
+
+    def try_extract(self, user_prompt: str):
+        """
+        Extract slots only when confident enough to skip the LLM.
+        Returns the info dict, or None when the caller should fall back to the LLM chain.
+        """
+        info, confidence = self.extract(user_prompt)
+        if confidence >= self.min_confidence:
+            self.stats["served"] += 1
+            return info
+        self.stats["deferred"] += 1
+        return None
+
+    @property
+    def served_fraction(self):
+        """Fraction of prompts answered locally instead of by the LLM."""
+        total = self.stats["served"] + self.stats["deferred"]
+        return self.stats["served"] / total if total else 0.0
+
+    def extract(self, user_prompt: str):
+        """
+        Extract slots from the prompt.
+
+        Returns:
+            A tuple of (info dict, confidence score).
+        """
+        text = user_prompt.lower().replace("-", " ")
+        spans = [m.span() for m in _TOKEN.finditer(text)]
+        tokens = [text[start:end] for start, end in spans]
+        used = set()
+
+        cuisine, mixed_cuisines = self._join_all(
+            self.cuisines.find_longest(tokens), used, text, spans, merge_adjacent=True
+        )
+        price = self._first(self.prices.find_longest(tokens), used)
+
+        location, mixed_locations = self._join_all(
+            self.locations.find_longest(tokens), used, text, spans
+        )
+        for abbreviation in self.case_sensitive_locations.findall(user_prompt):
+            value = CASE_SENSITIVE_LOCATIONS[abbreviation]
+            if location is None:
+                location = value
+            elif value not in location.split(" or "):
+                location = f"{location} or {value}"
+        location_score = 0.45
+        if location is None:
+            fallback = _IN_LOCATION.search(user_prompt)
+            if fallback:
+                location = fallback.group(1).rstrip(".")
+                location_score = 0.25
+            else:
+                location_score = 0.0
+
+        limit, counted = self._parse_limit(text)
+
+        confidence = location_score
+        if cuisine is not None:
+            confidence += 0.35
+        if len(tokens) <= 12:
+            confidence += 0.2
+        leftovers = {t for i, t in enumerate(tokens) if i not in used}
+        if " or " in f"{cuisine} {location}":
+            # "sushi or ramen" is a multi-intent request, not an ambiguous one.
+            leftovers.discard("or")
+        if leftovers & AMBIGUITY_MARKERS or leftovers & NEGATION_MARKERS:
+            confidence -= 0.3
+        if mixed_cuisines or mixed_locations:
+            # Several values not listed as alternatives ("pizza near Boston, thai in Austin").
+            confidence -= 0.3
+        if not counted and _BARE_NUMBER.search(text):
+            # A number that is not a restaurant count ("under 20 dollars", "for 2 people",
+            # "a group of six", "at eight") may still be one; leave it to the LLM.
+            confidence -= 0.3
+        confidence = round(max(0.0, min(confidence, 1.0)), 2)
+
+        info = {"cuisine": cuisine, "location": location, "price": price, "limit": limit}
+        return info, confidence
+
+    @staticmethod
+    def _join_all(matches, used, text, spans, merge_adjacent=False):
+        """
+        Join matched values listed as alternatives ("sushi or ramen", "sushi, ramen") with
+        " or " for multi-intent prompts. With ``merge_adjacent``, values right next to each
+        other form one term ("vegan pizza", "breakfast tacos").
+
+        Returns:
+            A tuple of (joined value or None, whether other matches were found that are
+            neither alternatives nor adjacent).
+        """
+        terms, mixed, prev_end = [], False, None
+        for start, end, value in matches:
+            used.update(range(start, end))
+            if prev_end is None:
+                terms.append([value])
+            else:
+                gap = text[spans[prev_end - 1][1] : spans[start][0]].strip()
+                if gap in ("or", ",", "/"):
+                    terms.append([value])
+                elif not gap and merge_adjacent:
+                    terms[-1].append(value)
+                elif any(value in term for term in terms):
+                    pass
+                else:
+                    mixed = True
+                    terms.append([value])
+            prev_end = end
+        values = []
+        for term in terms:
+            value = " ".join(dict.fromkeys(term))
+            if value not in values:
+                values.append(value)
+        return (" or ".join(values) if values else None), mixed
+
+    @staticmethod
+    def _first(matches, used):
+        if not matches:
+            return None
+        start, end, value = matches[0]
+        used.update(range(start, end))
+        return value
+
+    def _parse_limit(self, text):
+        """Return (limit, whether the prompt stated a restaurant count)."""
+        match = _NUMBER.search(text)
+        if not match:
+            return self.default_limit, False
+        raw = match.group(1)
+        value = NUMBER_WORDS.get(raw) or int(raw)
+        return (value, True) if 0 < value <= 50 else (self.default_limit, False)
@@ -0,0 +1,318 @@
+"""
+# Upstream Throttling
+# This module provides the client-side layer shared by the Yelp and Gemini clients:
+# single-flight coalescing of identical in-flight requests, an adaptive token-bucket limiter
+# per upstream, and retries with jittered exponential backoff that honor Retry-After.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class UpstreamError(Exception):
+    """An upstream HTTP error carrying the status code and any Retry-After delay."""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header given in seconds. Returns None when absent or invalid."""
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error):
+    """Return True for rate-limit and transient server errors (429/5xx)."""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return status in RETRYABLE_STATUS
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket that adapts its refill rate to upstream pushback.
+
+    ``rate`` tokens are added per second up to ``capacity``. When the upstream answers 429 the
+    rate is cut by ``decrease`` (and the bucket pauses for any Retry-After); each success then
+    nudges it back up towards the configured rate. A rate of None disables limiting.
+    """
+
+    def __init__(self, rate=None, capacity=None, decrease=0.5, recovery=0.05, min_rate=0.1):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate or 1.0)
+        self.decrease = decrease
+        self.recovery = recovery
+        self.min_rate = min_rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_time(self, tokens):
+        """Take tokens if available and return 0, else return seconds until they may be."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1, blocking=True, timeout=None):
+        """
+        Take ``tokens`` from the bucket, waiting for them if ``blocking``.
+        Returns True on success, False if not acquired (non-blocking or timed out).
+        """
+        if self.rate is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                wait = self._wait_time(tokens)
+            if not wait:
+                return True
+            if not blocking or (deadline is not None and time.monotonic() + wait > deadline):
+                return False
+            time.sleep(wait)
+
+    async def aacquire(self, tokens=1, blocking=True):
+        """Async counterpart of ``acquire``."""
+        if self.rate is None:
+            return True
+        while True:
+            with self._lock:
+                wait = self._wait_time(tokens)
+            if not wait:
+                return True
+            if not blocking:
+                return False
+            await asyncio.sleep(wait)
+
+    def on_throttled(self, retry_after=None):
+        """Back off after a 429: cut the rate and pause for Retry-After seconds if given."""
+        if self.rate is None:
+            return
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                self._tokens = 0.0
+
+    def on_success(self):
+        """Recover the rate additively towards the configured maximum."""
+        if self.rate is None or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery)
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while a call for a key is in flight, other callers
+    with the same key wait for and share its result instead of issuing their own.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """Asyncio counterpart of SingleFlight, for use on a single event loop."""
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn):
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+        task = self._calls[key] = asyncio.ensure_future(coro_fn())
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self._calls.get(key) is task:
+                del self._calls[key]
+
+
+class Upstream:
+    """
+    The throttling policy for one upstream service.
+
+    ``call`` coalesces identical in-flight requests, waits for a token, and retries 429/5xx
+    failures with full-jitter exponential backoff, sleeping at least any Retry-After delay.
+    A Retry-After longer than ``max_delay`` fails the call instead of sleeping.
+    """
+
+    def __init__(self, name, rate=None, burst=None, retries=3, base_delay=0.5, max_delay=30.0):
+        """
+        Initialize the upstream policy.
+
+        Args:
+            name (str): Upstream name, used in logs.
+            rate (float): Sustained requests per second; None for no limit.
+            burst (float): Token bucket capacity; defaults to one second of ``rate``.
+            retries (int): Retries after the first attempt for retryable errors.
+            base_delay (float): Backoff base in seconds.
+            max_delay (float): Upper bound for a single backoff sleep.
+        """
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.flights = SingleFlight()
+        self.async_flights = AsyncSingleFlight()
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0}
+
+    def _backoff(self, attempt, error):
+        """Seconds to sleep before the next attempt, or None if Retry-After exceeds max_delay."""
+        retry_after = getattr(error, "retry_after", None) or 0.0
+        if retry_after > self.max_delay:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        return max(delay, retry_after)
+
+    def _record_failure(self, error):
+        if (getattr(error, "status_code", None) or getattr(error, "code", None)) == 429:
+            self.stats["throttled"] += 1
+            self.bucket.on_throttled(getattr(error, "retry_after", None))
+
+    def _attempt(self, fn, throttle, retries):
+        for attempt in range(retries + 1):
+            if throttle:
+                self.bucket.acquire()
+            self.stats["calls"] += 1
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                self._record_failure(e)
+                # Out of retries, or Retry-After is too long to hold the request thread for.
+                delay = None if attempt == retries else self._backoff(attempt, e)
+                if delay is None:
+                    raise
+                self.stats["retries"] += 1
+                logger.warning("%s call failed (%s); retrying in %.2fs", self.name, e, delay)
+                time.sleep(delay)
+            else:
+                self.bucket.on_success()
+                return result
+
+    def call(self, key, fn, throttle=True, retries=None):
+        """
+        Run ``fn`` under this upstream's policy; concurrent calls with the same ``key`` share
+        one execution. Pass ``throttle=False`` when the client already takes bucket tokens, and
+        ``retries`` to override the upstream's retries, e.g. 0 when the client retries itself.
+        """
+        retries = self.retries if retries is None else retries
+        return self.flights.do(key, lambda: self._attempt(fn, throttle, retries))
+
+    async def _aattempt(self, coro_fn, throttle, retries):
+        for attempt in range(retries + 1):
+            if throttle:
+                await self.bucket.aacquire()
+            self.stats["calls"] += 1
+            try:
+                result = await coro_fn()
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                self._record_failure(e)
+                # Out of retries, or Retry-After is too long to hold the request thread for.
+                delay = None if attempt == retries else self._backoff(attempt, e)
+                if delay is None:
+                    raise
+                self.stats["retries"] += 1
+                logger.warning("%s call failed (%s); retrying in %.2fs", self.name, e, delay)
+                await asyncio.sleep(delay)
+            else:
+                self.bucket.on_success()
+                return result
+
+    async def acall(self, key, coro_fn, throttle=True, retries=None):
+        """Async counterpart of ``call``; ``coro_fn`` returns a new coroutine per attempt."""
+        retries = self.retries if retries is None else retries
+        return await self.async_flights.do(key, lambda: self._aattempt(coro_fn, throttle, retries))
+
+    def as_dict(self):
+        """Return call counters, coalesced calls and the bucket's current rate."""
+        return {
+            **self.stats,
+            "coalesced": self.flights.coalesced + self.async_flights.coalesced,
+            "rate": self.bucket.rate or 0.0,
+        }
+
+
+_UPSTREAMS = {}
+_UPSTREAMS_LOCK = threading.Lock()
+
+
+def get_upstream(name, **defaults):
+    """
+    Return the process-wide Upstream for ``name``, creating it on first use.
+
+    Quotas come from ``<NAME>_RATE_LIMIT`` (requests/second) and ``<NAME>_BURST`` environment
+    variables when set, otherwise from ``defaults``; see ``configure_upstream`` to override.
+    """
+    with _UPSTREAMS_LOCK:
+        upstream = _UPSTREAMS.get(name)
+        if upstream is None:
+            prefix = name.upper()
+            settings = dict(defaults)
+            if os.getenv(f"{prefix}_RATE_LIMIT"):
+                settings["rate"] = float(os.environ[f"{prefix}_RATE_LIMIT"])
+            if os.getenv(f"{prefix}_BURST"):
+                settings["burst"] = float(os.environ[f"{prefix}_BURST"])
+            upstream = _UPSTREAMS[name] = Upstream(name, **settings)
+        return upstream
+
+
+def configure_upstream(name, **settings):
+    """Replace the process-wide Upstream for ``name`` with one built from ``settings``."""
+    with _UPSTREAMS_LOCK:
+        upstream = _UPSTREAMS[name] = Upstream(name, **settings)
+        return upstream
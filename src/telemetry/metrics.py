@@ -0,0 +1,219 @@
+"""
+# Metrics
+# This module provides lightweight in-process instrumentation: timed spans, counters and
+# latency histograms with p50/p95/p99, plus collectors that surface existing cache and
+# upstream stats. Snapshots can be exported in memory, appended to a JSONL file, or served
+# as Prometheus text.
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import orjson
+
+PERCENTILES = (50, 95, 99)
+
+_PROMETHEUS_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class Histogram:
+    """
+    Records observations in a bounded reservoir of the most recent ``window`` values.
+    Count and sum cover every observation; percentiles cover the reservoir.
+    """
+
+    def __init__(self, window=2048):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._values = deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self._values.append(value)
+
+    def summary(self):
+        """Return count, mean, max and the configured percentiles as a dictionary."""
+        result = {"count": self.count, "mean": self.sum / self.count if self.count else 0.0}
+        values = np.fromiter(self._values, np.float64, len(self._values))
+        quantiles = np.percentile(values, PERCENTILES) if len(values) else [0.0] * len(PERCENTILES)
+        for p, value in zip(PERCENTILES, quantiles):
+            result[f"p{p}"] = float(value)
+        result["max"] = self.max
+        return result
+
+
+class Metrics:
+    """
+    A thread-safe registry of counters, histograms and collectors.
+
+    ``span(name)`` times a block with a monotonic clock and records milliseconds in the
+    ``name`` histogram; finished spans are also handed to every registered exporter. Collectors are
+    callables returning a flat dictionary of numbers (e.g. a cache's hit counters) that are
+    read when a snapshot is taken.
+    """
+
+    def __init__(self, window=2048):
+        self.window = window
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = {}
+        self.exporters = []
+        self._lock = threading.Lock()
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.window)
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the enclosed block; yields a dict where callers may add attributes."""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attributes
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            self.observe(name, elapsed_ms)
+            if error is not None:
+                self.incr(f"{name}.errors")
+            if self.exporters:
+                record = {"span": name, "ms": elapsed_ms, "ts": time.time(), **attributes}
+                if error is not None:
+                    record["error"] = error
+                for exporter in self.exporters:
+                    exporter.on_span(record)
+
+    def register_collector(self, name, collect):
+        """Register ``collect() -> dict`` whose values are reported as ``name.<key>``."""
+        with self._lock:
+            self.collectors[name] = collect
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+        return exporter
+
+    def snapshot(self):
+        """Return counters, histogram summaries and collected stats as plain dictionaries."""
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {name: h.summary() for name, h in self.histograms.items()}
+            collectors = list(self.collectors.items())
+        for name, collect in collectors:
+            for key, value in collect().items():
+                if isinstance(value, (int, float)):
+                    counters[f"{name}.{key}"] = value
+        return {"ts": time.time(), "counters": counters, "histograms": histograms}
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+# --- Exporters ---
+
+
+class InMemoryExporter:
+    """Keeps the most recent finished spans in memory."""
+
+    def __init__(self, max_spans=1000):
+        self.spans = deque(maxlen=max_spans)
+
+    def on_span(self, record):
+        self.spans.append(record)
+
+
+class JSONLExporter:
+    """Appends every finished span, and snapshots on request, to a JSONL file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def on_span(self, record):
+        self._write(record)
+
+    def write_snapshot(self, metrics):
+        self._write({"snapshot": metrics.snapshot()})
+
+    def _write(self, record):
+        line = orjson.dumps(record) + b"\n"
+        with self._lock, open(self.path, "ab") as f:
+            f.write(line)
+
+
+def to_prometheus(snapshot, prefix="restaurant_bot"):
+    """Render a snapshot in the Prometheus text exposition format."""
+
+    def _name(name):
+        return f"{prefix}_{_PROMETHEUS_NAME.sub('_', name)}"
+
+    lines = []
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append(f"# TYPE {_name(name)} gauge")
+        lines.append(f"{_name(name)} {value}")
+    for name, summary in sorted(snapshot["histograms"].items()):
+        metric = _name(name)
+        lines.append(f"# TYPE {metric} summary")
+        for p in PERCENTILES:
+            lines.append(f'{metric}{{quantile="{p / 100}"}} {summary[f"p{p}"]}')
+        lines.append(f"{metric}_count {summary['count']}")
+        lines.append(f"{metric}_sum {summary['mean'] * summary['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusExporter:
+    """Serves ``/metrics`` in Prometheus text format from a daemon thread."""
+
+    def __init__(self, metrics, port=9464, host="0.0.0.0"):
+        self.metrics = metrics
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = to_prometheus(exporter.metrics.snapshot()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def on_span(self, record):
+        pass
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# Process-wide registry used by the clients and the app.
+METRICS = Metrics()
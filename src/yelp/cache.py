@@ -0,0 +1,480 @@
+"""
+# Yelp Search Cache
+# This module provides a TTL + LRU response cache in front of YelpAPI's plain and paginated
+# searches. Entries are keyed on the normalized (term, location, price tier, limit or budget)
+# query and can live in process memory or in a SQLite file shared by several Streamlit workers.
+# Backends count hits per entry so popular queries can be kept warm (see src.yelp.warmer).
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+
+from src.yelp.yelp_api import YelpAPI
+
+logger = logging.getLogger(__name__)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize_text(value):
+    return _WHITESPACE.sub(" ", str(value or "")).strip().lower()
+
+
+def normalize_query(term, location, price=None, limit=5):
+    """
+    Normalize search arguments into the tuple used as the cache key.
+
+    Price is mapped to the Yelp tier actually sent upstream, so "moderate" and an unknown
+    price share an entry, exactly as they share a Yelp response.
+    """
+    return (
+        _normalize_text(term),
+        _normalize_text(location),
+        YelpAPI.PRICE_TIERS.get(price, "2"),
+        int(limit),
+    )
+
+
+def cache_key(query):
+    """Serialize a normalized query tuple into a string key."""
+    return "|".join(str(part) for part in query)
+
+
+def pages_key(query):
+    """Key for a paginated search; ``query`` holds the budget in place of the limit."""
+    return "pages:" + cache_key(query)
+
+
+_PRICE_NAMES = {tier: name for name, tier in YelpAPI.PRICE_TIERS.items()}
+
+
+def query_from_key(key):
+    """
+    Parse a cache key back into search arguments: a dictionary with ``term``, ``location``,
+    ``price`` (the tier mapped back to its name) and either ``limit`` or, for paginated-search
+    keys (see pages_key), ``budget``. Returns None for keys that do not parse.
+    """
+    size_field = "limit"
+    if key.startswith("pages:"):
+        key, size_field = key[len("pages:") :], "budget"
+    parts = key.split("|")
+    if len(parts) != 4 or parts[2] not in _PRICE_NAMES:
+        return None
+    term, location, tier, size = parts
+    try:
+        size = int(size)
+    except ValueError:
+        return None
+    return {"term": term, "location": location, "price": _PRICE_NAMES[tier], size_field: size}
+
+
+class CacheStats:
+    """Hit/miss counters for a cache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / lookups if lookups else 0.0
+
+    def as_dict(self):
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refreshes": self.refreshes,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU backend bounded by entry count and by serialized size in bytes.
+    Each entry also counts its hits.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (value, stored_at) for a key, or None if absent."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            value, size, stored_at, hits = entry
+            self._entries[key] = (value, size, stored_at, hits + 1)
+            return value, stored_at
+
+    def set(self, key, value, stored_at):
+        """
+        Store a value and return the number of entries evicted to make room.
+        Replacing an entry keeps its hit count; a new entry starts at one for its miss.
+        """
+        size = len(orjson.dumps(value))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            hits = 1
+            if previous is not None:
+                self._bytes -= previous[1]
+                hits = previous[3]
+            self._entries[key] = (value, size, stored_at, hits)
+            self._bytes += size
+            evicted = 0
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, (_, old_size, _, _) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                evicted += 1
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stored_at(self, key):
+        """Return when a key was stored, or None, without counting a hit."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[2]
+
+    def popular(self, n):
+        """Return up to ``n`` (key, stored_at, hits) tuples, most hit first."""
+        with self._lock:
+            entries = [(key, e[2], e[3]) for key, e in self._entries.items()]
+        entries.sort(key=lambda entry: entry[2], reverse=True)
+        return entries[:n]
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    On-disk LRU backend stored in a SQLite file.
+
+    Several processes (e.g. Streamlit workers) can point at the same file; WAL mode lets
+    readers proceed while another worker writes. The file persists across restarts, along
+    with each entry's fetch time and hit count.
+    """
+
+    def __init__(self, path, max_entries=10000, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS yelp_cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 1
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(yelp_cache)")}
+        if "hits" not in columns:
+            # Files written before hit counting was added.
+            self._conn.execute("ALTER TABLE yelp_cache ADD COLUMN hits INTEGER NOT NULL DEFAULT 1")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS yelp_cache_accessed ON yelp_cache (accessed_at)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS yelp_cache_hits ON yelp_cache (hits)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Return (value, stored_at) for a key, or None if absent."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM yelp_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE yelp_cache SET accessed_at = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+        return orjson.loads(row[0]), row[1]
+
+    def set(self, key, value, stored_at):
+        """
+        Store a value and return the number of entries evicted to make room.
+        Replacing an entry keeps its hit count; a new entry starts at one for its miss.
+        """
+        payload = orjson.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO yelp_cache (key, value, size, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "stored_at = excluded.stored_at, accessed_at = excluded.accessed_at",
+                (key, payload, len(payload), stored_at, time.time()),
+            )
+            evicted = self._evict()
+            self._conn.commit()
+            return evicted
+
+    def _evict(self):
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM yelp_cache"
+        ).fetchone()
+        evicted = 0
+        if count <= self.max_entries and total <= self.max_bytes:
+            return evicted
+        rows = self._conn.execute(
+            "SELECT key, size FROM yelp_cache ORDER BY accessed_at ASC"
+        ).fetchall()
+        doomed = []
+        for key, size in rows[:-1]:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+            evicted += 1
+        self._conn.executemany("DELETE FROM yelp_cache WHERE key = ?", doomed)
+        return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM yelp_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM yelp_cache")
+            self._conn.commit()
+
+    def stored_at(self, key):
+        """Return when a key was stored, or None, without counting a hit."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stored_at FROM yelp_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def popular(self, n):
+        """Return up to ``n`` (key, stored_at, hits) tuples, most hit first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, stored_at, hits FROM yelp_cache ORDER BY hits DESC LIMIT ?", (n,)
+            ).fetchall()
+
+    @property
+    def size_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM yelp_cache").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM yelp_cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedYelpAPI:
+    """
+    A caching wrapper exposing the same ``search`` interface as YelpAPI.
+
+    Fresh entries (younger than ``ttl``) are served directly. Entries within the additional
+    ``stale_ttl`` window are served immediately while a background refresh re-fetches them,
+    so hot queries never wait on Yelp. Anything older is fetched synchronously.
+    """
+
+    def __init__(self, yelp: YelpAPI, backend=None, ttl=600, stale_ttl=3600, refresh_workers=2):
+        """
+        Initialize the cache.
+
+        Args:
+            yelp (YelpAPI): The client used to fetch misses and refreshes.
+            backend: A MemoryCacheBackend or SQLiteCacheBackend. Defaults to in-process memory.
+            ttl (float): Seconds an entry is considered fresh.
+            stale_ttl (float): Extra seconds a stale entry may be served while refreshing.
+            refresh_workers (int): Threads available for background refreshes.
+        """
+        self.yelp = yelp
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stats = CacheStats()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix="yelp-cache-refresh"
+        )
+
+    def search(self, term, location, price, limit=5):
+        """
+        Search Yelp through the cache.
+        Returns a list of business dictionaries.
+        """
+        key = cache_key(normalize_query(term, location, price, limit))
+
+        def fetch():
+            return self.yelp.search(term, location, price, limit)
+
+        cached = self._lookup(key, fetch)
+        return cached if cached is not None else self._fetch(key, fetch)
+
+    def iter_search_pages(self, term, location, price, budget=100, page_size=YelpAPI.MAX_PAGE_SIZE):
+        """
+        Page through search results up to ``budget`` businesses through the cache.
+
+        Entries are keyed on the query and the budget. A cached result is yielded as a single
+        page; on a miss the pages stream straight from Yelp and are stored once all of them
+        have arrived.
+        """
+        key = pages_key(normalize_query(term, location, price, budget))
+        cached = self._lookup(
+            key, lambda: self.yelp.search_all(term, location, price, budget, page_size)
+        )
+        if cached is not None:
+            yield cached
+            return
+        businesses = []
+        for page in self.yelp.iter_search_pages(term, location, price, budget, page_size):
+            businesses.extend(page)
+            yield page
+        self.stats.evictions += self.backend.set(key, businesses, time.time())
+
+    def iter_search(self, term, location, price, budget=100, page_size=YelpAPI.MAX_PAGE_SIZE):
+        """Stream businesses from cached or paginated search results, up to ``budget``."""
+        for page in self.iter_search_pages(term, location, price, budget, page_size):
+            yield from page
+
+    def search_all(self, term, location, price, budget=100, page_size=YelpAPI.MAX_PAGE_SIZE):
+        """Fetch up to ``budget`` businesses across result pages through the cache."""
+        return list(self.iter_search(term, location, price, budget, page_size))
+
+    def _lookup(self, key, fetch):
+        """
+        Return the cached value for ``key`` if it is fresh or within the stale window (then
+        refreshing it in the background with ``fetch``); otherwise count a miss and return None.
+        """
+        entry = self.backend.get(key)
+        if entry is not None:
+            businesses, stored_at = entry
+            age = time.time() - stored_at
+            if age < self.ttl:
+                self.stats.hits += 1
+                return businesses
+            if age < self.ttl + self.stale_ttl:
+                self.stats.stale_hits += 1
+                self._schedule_refresh(key, fetch)
+                return businesses
+
+        self.stats.misses += 1
+        return None
+
+    def _fetch(self, key, fetch):
+        businesses = fetch()
+        self.stats.evictions += self.backend.set(key, businesses, time.time())
+        return businesses
+
+    def _schedule_refresh(self, key, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._refresh, key, fetch)
+
+    def _refresh(self, key, fetch):
+        try:
+            self._fetch(key, fetch)
+            self.stats.refreshes += 1
+        except Exception as e:
+            # Keep serving the stale entry; the next lookup will try again.
+            logger.warning("Background refresh failed for %s: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def warm(self, term, location, price, limit=5, budget=None):
+        """
+        Fetch a query from Yelp and store it, whether or not it is cached. With ``budget``,
+        the paginated search for that many results is fetched instead.
+        """
+        if budget is not None:
+            key = pages_key(normalize_query(term, location, price, budget))
+            return self._fetch(key, lambda: self.yelp.search_all(term, location, price, budget))
+        key = cache_key(normalize_query(term, location, price, limit))
+        return self._fetch(key, lambda: self.yelp.search(term, location, price, limit))
+
+    def entry_age(self, term, location, price, limit=5, budget=None):
+        """Seconds since the query was fetched, or None if it is not cached."""
+        if budget is not None:
+            key = pages_key(normalize_query(term, location, price, budget))
+        else:
+            key = cache_key(normalize_query(term, location, price, limit))
+        stored_at = self.backend.stored_at(key)
+        return None if stored_at is None else time.time() - stored_at
+
+    def popular(self, n=100):
+        """
+        Return up to ``n`` cached queries, most hit first, as dictionaries with the search
+        arguments (term, location, price and limit or budget, see query_from_key),
+        ``stored_at`` and ``hits``.
+        """
+        result = []
+        for key, stored_at, hits in self.backend.popular(n):
+            query = query_from_key(key)
+            if query is not None:
+                result.append({**query, "stored_at": stored_at, "hits": hits})
+        return result
+
+    def invalidate(self, term, location, price, limit=5):
+        """Drop a single query from the cache."""
+        self.backend.delete(cache_key(normalize_query(term, location, price, limit)))
+
+    def close(self):
+        """Stop background refreshes and close the wrapped client."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        close = getattr(self.backend, "close", None)
+        if close:
+            close()
+        self.yelp.close()
+
+    def __getattr__(self, name):
+        if name == "yelp":
+            raise AttributeError(name)
+        # Delegate everything else (format_businesses_for_chatbot, PRICE_TIERS, ...) to YelpAPI.
+        return getattr(self.yelp, name)
@@ -0,0 +1,240 @@
+"""
+# Local Restaurant Index
+# This module provides an in-memory restaurant store bulk-loaded from Yelp-shaped JSON dumps.
+# It answers search(term, location, price, limit) like YelpAPI does, using an inverted index
+# over category and name tokens, a city index, price/open-now filters and a spatial grid,
+# so busy metros can be served without a network round trip.
+"""
+
+import math
+import re
+from array import array
+
+import numpy as np
+import orjson
+
+from src.yelp.yelp_api import YelpAPI
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Query words that do not narrow a restaurant search.
+STOPWORDS = frozenset({"restaurant", "restaurants", "food", "place", "places", "the", "a"})
+EARTH_RADIUS_KM = 6371.0
+
+
+def _tokens(text):
+    return _TOKEN.findall(str(text or "").lower())
+
+
+def _normalize_location(location):
+    """Reduce "San Francisco, CA" style locations to the lowercase city part."""
+    return " ".join(_tokens(str(location or "").split(",")[0]))
+
+
+class LocalRestaurantIndex:
+    """
+    An in-memory, columnar restaurant index.
+
+    Businesses are kept as compact orjson payloads and only decoded for the rows returned.
+    Numeric fields live in NumPy columns, and every posting list (term, city, grid cell) is a
+    sorted int32 array, so a query is a handful of array intersections and one top-k pass.
+    """
+
+    def __init__(self, cell_degrees=0.01):
+        """
+        Initialize an empty index.
+
+        Args:
+            cell_degrees (float): Edge length of a spatial grid cell in degrees (~1 km).
+        """
+        self.cell_degrees = cell_degrees
+        self._ids = {}
+        self._payloads = []
+        self._rating = array("f")
+        self._review_count = array("i")
+        self._price = array("b")
+        self._open_now = array("b")
+        self._lat = array("f")
+        self._lon = array("f")
+        self._terms = {}
+        self._cities = {}
+        self._cells = {}
+        self._built = False
+
+    # --- Loading ---
+
+    @classmethod
+    def from_json(cls, *paths, **kwargs):
+        """Build an index from JSON dumps (see ``load_json``)."""
+        index = cls(**kwargs)
+        for path in paths:
+            index.load_json(path)
+        index.build()
+        return index
+
+    def load_json(self, path):
+        """
+        Load businesses from a file holding a Yelp search response ({"businesses": [...]}),
+        a JSON list of businesses, or one business per line (JSONL).
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            payload = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            payload = [orjson.loads(line) for line in data.splitlines() if line.strip()]
+        if isinstance(payload, dict):
+            payload = payload.get("businesses", [])
+        self.add(payload)
+
+    def add(self, businesses):
+        """Add Yelp business dictionaries to the index; duplicates by id are skipped."""
+        self._thaw()
+        for b in businesses:
+            business_id = b.get("id")
+            if business_id in self._ids:
+                continue
+            row = len(self._payloads)
+            self._ids[business_id] = row
+            self._payloads.append(orjson.dumps(b))
+
+            hours = (b.get("business_hours") or [{}])[0] or {}
+            coordinates = b.get("coordinates") or {}
+            lat, lon = coordinates.get("latitude"), coordinates.get("longitude")
+            self._rating.append(b.get("rating") or 0.0)
+            self._review_count.append(b.get("review_count") or 0)
+            self._price.append(len(b.get("price") or ""))
+            self._open_now.append(1 if hours.get("is_open_now") else 0)
+            self._lat.append(lat if lat is not None else math.nan)
+            self._lon.append(lon if lon is not None else math.nan)
+
+            terms = set(_tokens(b.get("name")))
+            for category in b.get("categories", []):
+                terms.update(_tokens(category.get("alias", "").replace("_", " ")))
+                terms.update(_tokens(category.get("title")))
+            for term in terms:
+                self._terms.setdefault(term, array("i")).append(row)
+
+            city = _normalize_location((b.get("location") or {}).get("city"))
+            if city:
+                self._cities.setdefault(city, array("i")).append(row)
+            if lat is not None and lon is not None:
+                self._cells.setdefault(self._cell(lat, lon), array("i")).append(row)
+
+    def build(self):
+        """Freeze the loaded data into NumPy columns and posting arrays."""
+        if self._built:
+            return
+        self._rating = np.frombuffer(self._rating, dtype=np.float32).copy()
+        self._review_count = np.frombuffer(self._review_count, dtype=np.int32).copy()
+        self._price = np.frombuffer(self._price, dtype=np.int8).copy()
+        self._open_now = np.frombuffer(self._open_now, dtype=np.int8).copy()
+        self._lat = np.frombuffer(self._lat, dtype=np.float32).copy()
+        self._lon = np.frombuffer(self._lon, dtype=np.float32).copy()
+        for postings in (self._terms, self._cities, self._cells):
+            for key, rows in postings.items():
+                postings[key] = np.frombuffer(rows, dtype=np.int32).copy()
+        self._built = True
+
+    def _thaw(self):
+        """Turn frozen arrays back into appendable buffers before adding more data."""
+        if not self._built:
+            return
+        for name, code in (
+            ("_rating", "f"),
+            ("_review_count", "i"),
+            ("_price", "b"),
+            ("_open_now", "b"),
+            ("_lat", "f"),
+            ("_lon", "f"),
+        ):
+            setattr(self, name, array(code, getattr(self, name).tobytes()))
+        for postings in (self._terms, self._cities, self._cells):
+            for key, rows in postings.items():
+                postings[key] = array("i", rows.tobytes())
+        self._built = False
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    # --- Queries ---
+
+    def covers(self, location):
+        """Return True if the index holds businesses for the given location."""
+        return _normalize_location(location) in self._cities
+
+    def search(self, term, location, price, limit=5, open_now=False):
+        """
+        Search the index for businesses matching the term and location.
+        Returns a list of business dictionaries, best rated first (empty on a miss).
+        """
+        self.build()
+        rows = self._cities.get(_normalize_location(location))
+        if rows is None:
+            return []
+        rows = self._filter_rows(rows, term, price, open_now)
+        return self._top(rows, limit)
+
+    def search_near(
+        self, term, latitude, longitude, radius_km=2.0, price=None, limit=5, open_now=False
+    ):
+        """
+        Search for businesses within ``radius_km`` of a coordinate using the spatial grid.
+        Returns a list of business dictionaries, best rated first.
+        """
+        self.build()
+        lat_reach = int(math.ceil(radius_km / (111.0 * self.cell_degrees)))
+        # A degree of longitude shrinks with latitude, so more columns are needed away from the equator.
+        lon_km = 111.0 * max(math.cos(math.radians(latitude)), 0.01)
+        lon_reach = int(math.ceil(radius_km / (lon_km * self.cell_degrees)))
+        lat_cell, lon_cell = self._cell(latitude, longitude)
+        cells = [
+            self._cells.get((lat_cell + dy, lon_cell + dx))
+            for dy in range(-lat_reach, lat_reach + 1)
+            for dx in range(-lon_reach, lon_reach + 1)
+        ]
+        cells = [c for c in cells if c is not None]
+        if not cells:
+            return []
+        rows = np.sort(np.concatenate(cells))
+
+        lat1, lon1 = np.radians(latitude), np.radians(longitude)
+        lat2, lon2 = np.radians(self._lat[rows]), np.radians(self._lon[rows])
+        a = (
+            np.sin((lat2 - lat1) / 2) ** 2
+            + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        )
+        distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        rows = rows[distance <= radius_km]
+        rows = self._filter_rows(rows, term, price, open_now)
+        return self._top(rows, limit)
+
+    def _filter_rows(self, rows, term, price, open_now):
+        for token in _tokens(term):
+            if token in STOPWORDS:
+                continue
+            postings = self._terms.get(token)
+            if postings is None:
+                return rows[:0]
+            rows = np.intersect1d(rows, postings, assume_unique=True)
+        # Mirror YelpAPI.search, which sends tier "2" when the price is missing or unknown.
+        tier = int(YelpAPI.PRICE_TIERS.get(price, "2"))
+        rows = rows[self._price[rows] == tier]
+        if open_now:
+            rows = rows[self._open_now[rows] == 1]
+        return rows
+
+    def _top(self, rows, limit):
+        if not len(rows):
+            return []
+        score = self._rating[rows].astype(np.float64) * 1e6 + np.minimum(
+            self._review_count[rows], 999_999
+        )
+        if len(rows) > limit:
+            top = np.argpartition(-score, limit - 1)[:limit]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-score[top], kind="stable")]
+        return [orjson.loads(self._payloads[row]) for row in rows[top]]
+
+    def __len__(self):
+        return len(self._payloads)
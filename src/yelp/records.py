@@ -0,0 +1,91 @@
+"""
+# Restaurant Records
+# This module provides a compact, slotted record for formatted Yelp businesses.
+# Records read like the formatted dictionaries (record["name"], record.get("phone")) so the
+# UI can render either, while using far less memory per business.
+"""
+
+import sys
+
+
+def restaurant_key(restaurant):
+    """Returns the identity used to deduplicate a restaurant: its Yelp id, else name + address."""
+    return restaurant.get("id") or (restaurant.get("name"), restaurant.get("address"))
+
+
+class RestaurantRecord:
+    """
+    A formatted Yelp business stored in ``__slots__``.
+    Category and transaction strings are interned so repeats share one object.
+    """
+
+    FIELDS = (
+        "id",
+        "name",
+        "rating",
+        "review_count",
+        "address",
+        "phone",
+        "url",
+        "is_closed",
+        "categories",
+        "transactions",
+        "is_open_now",
+        "price",
+        "distance",
+    )
+    __slots__ = FIELDS
+
+    def __init__(
+        self,
+        id=None,
+        name=None,
+        rating=None,
+        review_count=None,
+        address="",
+        phone=None,
+        url=None,
+        is_closed=None,
+        categories=(),
+        transactions=(),
+        is_open_now=False,
+        price=None,
+        distance=None,
+    ):
+        self.id = id
+        self.name = name
+        self.rating = rating
+        self.review_count = review_count
+        self.address = address
+        self.phone = phone
+        self.url = url
+        self.is_closed = is_closed
+        self.categories = tuple(sys.intern(c) for c in categories)
+        self.transactions = tuple(sys.intern(t) for t in transactions)
+        self.is_open_now = is_open_now
+        self.price = price
+        self.distance = distance
+
+    @classmethod
+    def from_dict(cls, restaurant):
+        """Build a record from a dictionary returned by YelpAPI.format_businesses_for_chatbot."""
+        return cls(**{field: restaurant[field] for field in cls.FIELDS if field in restaurant})
+
+    def to_dict(self):
+        """Return the record as a formatted restaurant dictionary."""
+        result = {field: getattr(self, field) for field in self.FIELDS}
+        result["categories"] = list(self.categories)
+        result["transactions"] = list(self.transactions)
+        return result
+
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+    def __repr__(self):
+        return f"RestaurantRecord(id={self.id!r}, name={self.name!r})"
@@ -0,0 +1,136 @@
+"""
+# Cache Warmer
+# This module keeps the most popular Yelp queries fresh in a CachedYelpAPI. A background
+# thread periodically re-fetches hot entries before they expire, plus any configured seed
+# queries that are not cached yet, without exceeding a quota of Yelp calls per minute.
+"""
+
+import logging
+import threading
+import time
+
+import orjson
+
+from src.net.throttle import TokenBucket
+from src.yelp.cache import CachedYelpAPI
+from src.yelp.yelp_api import YelpAPI
+
+logger = logging.getLogger(__name__)
+
+
+def load_seed_queries(path):
+    """
+    Load seed queries from a JSON list or a JSONL file of objects with ``term`` (or
+    ``cuisine``), ``location`` and optional ``price`` and ``limit`` fields. A ``budget``
+    field seeds the paginated search used with CANDIDATE_BUDGET instead.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        rows = orjson.loads(data)
+    except orjson.JSONDecodeError:
+        rows = [orjson.loads(line) for line in data.splitlines() if line.strip()]
+    seeds = []
+    for row in rows:
+        seed = {
+            "term": row.get("term") or row.get("cuisine") or "restaurant",
+            "location": row["location"],
+            "price": row.get("price"),
+        }
+        if row.get("budget"):
+            seed["budget"] = int(row["budget"])
+        else:
+            seed["limit"] = int(row.get("limit") or 5)
+        seeds.append(seed)
+    return seeds
+
+
+class CacheWarmer:
+    """
+    Refreshes popular cache entries in the background.
+
+    Each cycle looks at the ``top_n`` most hit entries and re-fetches those older than
+    ``refresh_ahead`` of the cache TTL (most popular first), after fetching any seed queries
+    missing from the cache. Fetches draw from a token bucket of ``quota_per_minute`` calls;
+    once it is empty the rest of the cycle is skipped.
+    """
+
+    def __init__(
+        self,
+        cache: CachedYelpAPI,
+        quota_per_minute=30,
+        top_n=300,
+        interval=30.0,
+        refresh_ahead=0.8,
+        seeds=(),
+    ):
+        """
+        Initialize the warmer.
+
+        Args:
+            cache (CachedYelpAPI): The cache to keep warm.
+            quota_per_minute (float): Yelp calls the warmer may spend per minute.
+            top_n (int): Number of most popular entries considered each cycle.
+            interval (float): Seconds between cycles.
+            refresh_ahead (float): Fraction of the TTL after which an entry is refreshed.
+            seeds (list): Queries to fetch at startup if not cached (see load_seed_queries).
+        """
+        self.cache = cache
+        self.top_n = top_n
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.seeds = list(seeds)
+        self.budget = TokenBucket(quota_per_minute / 60.0, capacity=quota_per_minute)
+        self.stats = {"cycles": 0, "warmed": 0, "errors": 0, "deferred": 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def due(self):
+        """Return the queries to fetch this cycle, in priority order."""
+        due = []
+        for seed in self.seeds:
+            if self.cache.entry_age(**seed) is None:
+                due.append(seed)
+        refresh_before = time.time() - self.cache.ttl * self.refresh_ahead
+        for entry in self.cache.popular(self.top_n):
+            if entry["stored_at"] <= refresh_before:
+                due.append({k: v for k, v in entry.items() if k not in ("stored_at", "hits")})
+        return due
+
+    def warm_once(self):
+        """Run one warming cycle and return the number of queries fetched."""
+        warmed = 0
+        due = self.due()
+        for i, query in enumerate(due):
+            # A paginated search costs one Yelp call per page.
+            pages = -(-query["budget"] // YelpAPI.MAX_PAGE_SIZE) if "budget" in query else 1
+            if not self.budget.acquire(min(pages, self.budget.capacity), blocking=False):
+                self.stats["deferred"] += len(due) - i
+                break
+            try:
+                self.cache.warm(**query)
+                warmed += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning("Warming %s failed: %s", query, e)
+        self.stats["cycles"] += 1
+        self.stats["warmed"] += warmed
+        return warmed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.warm_once()
+            except Exception:
+                logger.exception("Cache warming cycle failed")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start warming in a daemon thread; the first cycle runs immediately."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="yelp-cache-warmer", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
@@ -4,14 +4,43 @@
 # It allows you to search for businesses and format the results for chatbot responses.
 """
 
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.net.throttle import UpstreamError, get_upstream, parse_retry_after
+from src.telemetry.metrics import METRICS
+from src.yelp.records import RestaurantRecord
+
+logger = logging.getLogger(__name__)
+
+# When DEBUG logging is enabled, log one in every LOG_SAMPLE_EVERY formatted businesses.
+LOG_SAMPLE_EVERY = 50
+
+
+class YelpAPIError(UpstreamError):
+    """Raised when the Yelp API answers with a non-200 status."""
+
+    @classmethod
+    def from_response(cls, status_code, text, headers):
+        return cls(
+            f"Error fetching data from Yelp API: {status_code} - {text}",
+            status_code=status_code,
+            retry_after=parse_retry_after(headers.get("Retry-After")),
+        )
 
 
 class YelpAPI:
     """
     A client for the Yelp API to search for businesses.
+
+    The client owns a pooled, keep-alive ``requests.Session`` so repeated searches reuse
+    the same TCP/TLS connections and auth headers instead of opening a new socket per call.
     """
 
     PRICE_TIERS = {
@@ -21,60 +50,288 @@ class YelpAPI:
         "very expensive": "4",
     }
 
-    def __init__(self, api_key=None, base_url=None):
-        """Initialize the YelpAPI client."""
+    DEFAULT_BASE_URL = "https://api.yelp.com/v3/businesses/search"
+    # Yelp caps a single search page at 50 results and offset + limit at 240.
+    MAX_PAGE_SIZE = 50
+    MAX_SEARCH_RESULTS = 240
+
+    def __init__(
+        self,
+        api_key=None,
+        base_url=None,
+        pool_size=10,
+        max_retries=3,
+        backoff_factor=0.3,
+        timeout=(3.05, 10),
+        page_workers=4,
+        upstream=None,
+    ):
+        """
+        Initialize the YelpAPI client.
+
+        Args:
+            api_key (str): The Yelp API key. Falls back to the YELP_API_KEY environment variable.
+            base_url (str): The business search endpoint.
+            pool_size (int): Maximum number of keep-alive connections kept in the pool.
+            max_retries (int): Retries for connection errors.
+            backoff_factor (float): Exponential backoff factor between connection retries.
+            timeout (float | tuple): Requests timeout, either total or (connect, read).
+            page_workers (int): Threads used to fetch result pages concurrently.
+            upstream (Upstream): Throttling policy; defaults to the shared "yelp" upstream,
+                which coalesces identical searches, rate-limits and retries 429/5xx.
+        """
         self.api_key = api_key or os.getenv("YELP_API_KEY")
-        self.base_url = base_url or "https://api.yelp.com/v3/businesses/search"
+        self.base_url = base_url or self.DEFAULT_BASE_URL
         if not self.api_key:
             raise ValueError(
                 "Yelp API key not found. Please set the YELP_API_KEY environment variable."
             )
+        self.timeout = timeout
+        self.session = self._build_session(pool_size, max_retries, backoff_factor)
+        self.page_workers = page_workers
+        self._page_pool = None
+        self.upstream = upstream or get_upstream("yelp")
 
-    def search(self, term, location, price, limit=5):
+    def _build_session(self, pool_size, max_retries, backoff_factor):
         """
-        Search Yelp for businesses matching the term and location.
-        Returns a list of business dictionaries.
+        Create a keep-alive session with a sized connection pool and retry policy.
+        Status-based retries (429/5xx) are left to the upstream policy.
         """
-        headers = {"Authorization": f"Bearer {self.api_key}"}
+        retry = Retry(
+            total=max_retries,
+            status=0,
+            backoff_factor=backoff_factor,
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(
+            {"Authorization": f"Bearer {self.api_key}", "Accept": "application/json"}
+        )
+        return session
+
+    @classmethod
+    def build_params(cls, term, location, price, limit=5, offset=0):
+        """Build the query parameters for a business search."""
         params = {
             "term": term,
             "location": location,
             "limit": limit,
-            "price": self.PRICE_TIERS.get(price, "2"),
+            "price": cls.PRICE_TIERS.get(price, "2"),
         }
-        response = requests.get(self.base_url, headers=headers, params=params, timeout=10)
+        if offset:
+            params["offset"] = offset
+        return params
+
+    def _get(self, params):
+        """
+        Run one search request and return the decoded response body.
+        Identical concurrent requests share one upstream call.
+        """
+        key = tuple(sorted(params.items()))
+        return self.upstream.call(key, lambda: self._request(params))
+
+    def _request(self, params):
+        with METRICS.span("yelp.request"):
+            response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        METRICS.observe("yelp.payload_bytes", len(response.content))
         if response.status_code != 200:
-            raise Exception(
-                f"Error fetching data from Yelp API: {response.status_code} - {response.text}"
+            raise YelpAPIError.from_response(response.status_code, response.text, response.headers)
+        return orjson.loads(response.content)
+
+    def search(self, term, location, price, limit=5):
+        """
+        Search Yelp for businesses matching the term and location.
+        Returns a list of business dictionaries.
+        """
+        params = self.build_params(term, location, price, limit)
+        return self._get(params).get("businesses", [])
+
+    def iter_search_pages(self, term, location, price, budget=100, page_size=MAX_PAGE_SIZE):
+        """
+        Page through search results up to ``budget`` businesses.
+
+        The first page is fetched to learn the total; the remaining pages are then fetched
+        concurrently on a shared pool while the first page is already being consumed.
+        Yields lists of business dictionaries in the order the pages arrive.
+        """
+        budget = min(budget, self.MAX_SEARCH_RESULTS)
+        page_size = min(page_size, self.MAX_PAGE_SIZE, budget)
+        first = self._get(self.build_params(term, location, price, page_size))
+        total = min(first.get("total", 0), budget)
+
+        if self._page_pool is None:
+            self._page_pool = ThreadPoolExecutor(
+                max_workers=self.page_workers, thread_name_prefix="yelp-page"
+            )
+        futures = [
+            self._page_pool.submit(
+                self._get,
+                self.build_params(
+                    term, location, price, min(page_size, total - offset), offset=offset
+                ),
             )
-        response.raise_for_status()
-        return response.json().get("businesses", [])
+            for offset in range(page_size, total, page_size)
+        ]
+        try:
+            yield first.get("businesses", [])
+            for future in as_completed(futures):
+                yield future.result().get("businesses", [])
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def iter_search(self, term, location, price, budget=100, page_size=MAX_PAGE_SIZE):
+        """
+        Stream businesses from paginated search results, up to ``budget`` of them.
+        Yields business dictionaries as their page arrives.
+        """
+        for page in self.iter_search_pages(term, location, price, budget, page_size):
+            yield from page
+
+    def search_all(self, term, location, price, budget=100, page_size=MAX_PAGE_SIZE):
+        """
+        Fetch up to ``budget`` businesses across result pages.
+        Returns a list of business dictionaries.
+        """
+        return list(self.iter_search(term, location, price, budget, page_size))
+
+    def close(self):
+        """Close the underlying session and release pooled connections."""
+        if self._page_pool is not None:
+            self._page_pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def iter_format_businesses(businesses):
+        """
+        Format Yelp business results lazily, one RestaurantRecord per business.
+        Field values are shared with the payload rather than copied; category and
+        transaction strings are interned.
+        """
+        debug = logger.isEnabledFor(logging.DEBUG)
+        count = 0
+        for count, b in enumerate(businesses, 1):
+            if debug and count % LOG_SAMPLE_EVERY == 1:
+                logger.debug("Formatting business %s (%s)", b.get("id"), b.get("name"))
+            hours_info = (b.get("business_hours") or [{}])[0]
+            location = b.get("location")
+            yield RestaurantRecord(
+                id=b.get("id"),
+                name=b.get("name"),
+                rating=b.get("rating"),
+                review_count=b.get("review_count"),
+                address=", ".join(location.get("display_address", [])) if location else "",
+                phone=b.get("display_phone"),
+                url=b.get("url"),
+                is_closed=b.get("is_closed"),
+                categories=[c["title"] for c in b.get("categories", ()) if c.get("title")],
+                transactions=b.get("transactions", ()),
+                is_open_now=hours_info.get("is_open_now", False) if hours_info else False,
+                price=b.get("price"),
+                distance=b.get("distance"),
+            )
+        if debug:
+            logger.debug("Formatted %d Yelp businesses", count)
 
     @staticmethod
     def format_businesses_for_chatbot(businesses):
         """
         Format Yelp business results for chatbot response.
+        Returns a list of RestaurantRecord objects, which read like the formatted dicts.
+        """
+        return list(YelpAPI.iter_format_businesses(businesses))
+
+
+class AsyncYelpAPI:
+    """
+    An asyncio client for the Yelp API backed by a shared ``httpx.AsyncClient``.
+
+    A single instance can serve many concurrent chat sessions; all of them share one
+    keep-alive connection pool instead of each blocking on its own socket.
+    """
+
+    PRICE_TIERS = YelpAPI.PRICE_TIERS
+
+    def __init__(
+        self,
+        api_key=None,
+        base_url=None,
+        pool_size=20,
+        max_keepalive=10,
+        max_retries=3,
+        timeout=10.0,
+        connect_timeout=3.05,
+        upstream=None,
+    ):
+        """
+        Initialize the AsyncYelpAPI client.
+
+        Args:
+            api_key (str): The Yelp API key. Falls back to the YELP_API_KEY environment variable.
+            base_url (str): The business search endpoint.
+            pool_size (int): Maximum number of concurrent connections.
+            max_keepalive (int): Maximum number of idle keep-alive connections.
+            max_retries (int): Retries for failed connection attempts.
+            timeout (float): Read/write/pool timeout in seconds.
+            connect_timeout (float): Connect timeout in seconds.
+            upstream (Upstream): Throttling policy; defaults to the shared "yelp" upstream.
+        """
+        self.api_key = api_key or os.getenv("YELP_API_KEY")
+        self.base_url = base_url or YelpAPI.DEFAULT_BASE_URL
+        if not self.api_key:
+            raise ValueError(
+                "Yelp API key not found. Please set the YELP_API_KEY environment variable."
+            )
+        import httpx  # Deferred: only async callers pay for importing httpx.
+
+        self.client = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {self.api_key}", "Accept": "application/json"},
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=max_keepalive),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            transport=httpx.AsyncHTTPTransport(retries=max_retries),
+        )
+        self.upstream = upstream or get_upstream("yelp")
+
+    async def search(self, term, location, price, limit=5):
         """
-        print("Formatting Yelp businesses for chatbot response...")
-        results = []
-        for b in businesses:
-            print(f"Processing: {b}")
-            categories_list = [c.get("title") for c in b.get("categories", []) if c.get("title")]
-            hours_info = b.get("business_hours", [{}])[0]
-            result = {
-                "name": b.get("name"),
-                "rating": b.get("rating"),
-                "review_count": b.get("review_count"),
-                "address": ", ".join(b.get("location", {}).get("display_address", [])),
-                "phone": b.get("display_phone"),
-                "url": b.get("url"),
-                "is_closed": b.get("is_closed"),
-                "categories": categories_list,
-                "transactions": b.get("transactions", []),
-                "is_open_now": hours_info.get("is_open_now", False) if hours_info else False,
-            }
-            results.append(result)
-        return results
+        Search Yelp for businesses matching the term and location.
+        Returns a list of business dictionaries.
+        """
+        params = YelpAPI.build_params(term, location, price, limit)
+        key = tuple(sorted(params.items()))
+        body = await self.upstream.acall(key, lambda: self._request(params))
+        return body.get("businesses", [])
+
+    async def _request(self, params):
+        with METRICS.span("yelp.request"):
+            response = await self.client.get(self.base_url, params=params)
+        METRICS.observe("yelp.payload_bytes", len(response.content))
+        if response.status_code != 200:
+            raise YelpAPIError.from_response(response.status_code, response.text, response.headers)
+        return orjson.loads(response.content)
+
+    async def aclose(self):
+        """Close the underlying client and release pooled connections."""
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    iter_format_businesses = staticmethod(YelpAPI.iter_format_businesses)
+    format_businesses_for_chatbot = staticmethod(YelpAPI.format_businesses_for_chatbot)
 
 
 # Example usage: